@@ -138,6 +138,19 @@ STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are streamed from Django's temporary upload file, so this only bounds disk use.
+UPLOAD_MAX_SIZE = env.int("UPLOAD_MAX_SIZE", default=500 * 1024 * 1024)
+
+# Processes used by the background validation worker; 1 runs every scan in-process.
+VALIDATION_WORKERS = env.int("VALIDATION_WORKERS", default=1)
+
+# Seconds a running background job may go without reporting progress before it
+# is marked failed; its worker is assumed to have died.
+JOB_TIMEOUT = env.int("JOB_TIMEOUT", default=3600)
+
+# Processes that parse CSV uploads larger than one chunk; 1 parses in the request.
+INGEST_WORKERS = env.int("INGEST_WORKERS", default=1)
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 # Default primary key field type
@@ -0,0 +1,194 @@
+import hashlib
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Q
+
+FAMILY = 'family'
+ADULT = 'adult'
+CHILD = 'child'
+
+ADULT_AFFILIATIONS = ['1', '2', '3', '4', '5']
+CHILD_AFFILIATIONS = ['1', '2', '3', '4', '5']
+YES_NO = ['1', '2']
+EDUCATION_LEVELS = [str(n).zfill(2) for n in range(1, 17)] + ['98']
+RELATIONSHIPS = [str(n).zfill(2) for n in range(1, 11)]
+WORK_PARTICIPATION = ['01', '02'] + [str(n).zfill(2) for n in range(5, 20)] + ['99']
+
+
+class Edit:
+    """One federal edit, described as data.
+
+    An edit applies to records of ``record_type`` whose family affiliation is in
+    ``affiliations`` (any affiliation when None) and whose fields match every
+    ``when`` entry ({field: [values]}). A record that applies fails the edit when
+    ``field`` is not one of ``allowed``, is one of ``forbidden``, or is blank
+    while ``required``.
+    """
+
+    def __init__(self, edit_number, item_number, record_type, field, description, message,
+                 affiliations=None, when=None, allowed=None, forbidden=None, required=False, edit_type='FATAL'):
+        if allowed is None and forbidden is None and not required:
+            raise ValueError(f"Edit {edit_number} does not check anything.")
+        self.edit_number = edit_number
+        self.item_number = item_number
+        self.record_type = record_type
+        self.field = field
+        self.description = description
+        self.message = message
+        self.affiliations = affiliations
+        self.when = when or {}
+        self.allowed = allowed
+        self.forbidden = forbidden
+        self.required = required
+        self.edit_type = edit_type
+
+    def __repr__(self):
+        return f"<Edit {self.edit_number} item {self.item_number}>"
+
+    def conditions(self):
+        conditions = dict(self.when)
+        if self.affiliations is not None:
+            conditions['family_affiliation'] = self.affiliations
+        return conditions
+
+    def q(self):
+        """Compile the edit into a Q matching the records that fail it."""
+        failures = []
+        if self.allowed is not None:
+            failures.append(~Q(**{f'{self.field}__in': self.allowed}))
+        if self.forbidden is not None:
+            failures.append(Q(**{f'{self.field}__in': self.forbidden}))
+        if self.required:
+            failures.append(Q(**{self.field: ''}) | Q(**{f'{self.field}__isnull': True}))
+
+        conditions = [Q(**{f'{field}__in': values}) for field, values in self.conditions().items()]
+        return reduce(and_, conditions + [reduce(or_, failures)])
+
+
+
+def race_edits(record_type, item, edit_number, affiliation_item, reported_affiliations, reported_label, blank_affiliations):
+    """Build the blank/value edit pairs for the six race and ethnicity fields."""
+    edits = []
+    fields = ['item34a_hispanic_latino', 'item34b_american_indian_alaska_native', 'item34c_asian',
+              'item34d_black', 'item34e_native_pacific_islander', 'item34f_white']
+    for offset, (letter, field) in enumerate(zip('ABCDEF', fields)):
+        number = edit_number + offset * 2
+        edits.append(Edit(f'T1-{number:03d}', item, record_type, 'family_affiliation', 'RACE/ETHNICITY',
+                          f'IF ITEM {item}{letter} = BLANK ITEM {affiliation_item} MUST = {",".join(blank_affiliations)}',
+                          when={field: ['']}, allowed=blank_affiliations))
+        edits.append(Edit(f'T1-{number + 1:03d}', item, record_type, field, 'RACE/ETHNICITY',
+                          f'IF ITEM {affiliation_item}= {reported_label}, ITEM {item}{letter} MUST = 1 OR 2',
+                          affiliations=reported_affiliations, allowed=YES_NO))
+    return edits
+
+
+FAMILY_EDITS = [
+    Edit('T1-004', '6', FAMILY, 'case_number', 'CASE NUMBER', 'ITEM 6 MUST NOT BE BLANK', required=True),
+    Edit('T1-008', '9', FAMILY, 'disposition', 'DISPOSITION', 'ITEM 9 MUST = 1-2', allowed=['1', '2']),
+    Edit('T1-010', '11', FAMILY, 'num_family_members', 'NUMBER OF FAMILY MEMBERS', 'ITEM 11 MUST > 0',
+         forbidden=['0', '00'], required=True),
+    Edit('T1-011', '12', FAMILY, 'family_type', 'FAMILY TYPE FOR WORK PARTICIPATION', 'ITEM 12 MUST = 1-3',
+         allowed=['1', '2', '3']),
+]
+
+ADULT_EDITS = [
+    Edit('T1-014', '30', ADULT, 'family_affiliation', 'FAMILY AFFILIATION -ADULT', 'ITEM 30 MUST = 1-5',
+         allowed=ADULT_AFFILIATIONS),
+    Edit('T1-015', '32', ADULT, 'date_of_birth', 'DATE OF BIRTH -ADULT', 'ITEM 32 MUST NOT BE BLANK OR ZEROES',
+         forbidden=['00000000'], required=True),
+    Edit('T1-016', '32', ADULT, 'family_affiliation', 'DATE OF BIRTH -ADULT', 'IF ITEM 32 = 99999999 ITEM 30 MUST = 2-5',
+         when={'date_of_birth': ['99999999']}, allowed=['2', '3', '4', '5']),
+    Edit('T1-017', '33', ADULT, 'ssn', 'SSN -ADULT', 'ITEM 33 MUST NOT BE BLANK', required=True),
+    Edit('T1-018', '33', ADULT, 'family_affiliation', 'SSN -ADULT', 'IF ITEM 33 = 999999999 ITEM 30 MUST = 2-5',
+         when={'ssn': ['999999999']}, allowed=['2', '3', '4', '5']),
+    *race_edits(ADULT, '34', 19, '30', ['1', '2', '3', '4'], '1-4', ['5']),
+    Edit('T1-031', '37', ADULT, 'family_affiliation', 'MARITAL STATUS', 'IF ITEM 37 = BLANK, ITEM 30 MUST = 5',
+         when={'marital_status': ['']}, allowed=['5']),
+    Edit('T1-032', '37', ADULT, 'marital_status', 'MARITAL STATUS', 'IF ITEM 30 = 1-4, ITEM 37 MUST = 1-5',
+         affiliations=['1', '2', '3', '4'], allowed=['1', '2', '3', '4', '5']),
+    Edit('T1-033', '38', ADULT, 'relationship_to_hoh', 'RELATIONSHIP TO HEAD OF HOUSEHOLD', 'ITEM 38 MUST = 01-10',
+         allowed=RELATIONSHIPS),
+    Edit('T1-034', '39', ADULT, 'family_affiliation', 'PARENT WITH MINOR CHILD IN THE FAMILY',
+         'IF ITEM 39 = BLANK, ITEM 30 MUST = 3 OR 5', when={'parent_with_minor_child': ['']}, allowed=['3', '5']),
+    Edit('T1-035', '39', ADULT, 'parent_with_minor_child', 'PARENT WITH MINOR CHILD IN THE FAMILY',
+         'IF ITEM 30 = 1,2,4 , ITEM 39 MUST = 1-3', affiliations=['1', '2', '4'], allowed=['1', '2', '3']),
+    Edit('T1-036', '41', ADULT, 'educational_level', 'EDUCATION LEVEL', 'IF ITEM 30 = 2-5 ITEM 41 MUST = 01-16,98,99',
+         affiliations=['2', '3', '4', '5'], allowed=EDUCATION_LEVELS + ['99']),
+    Edit('T1-037', '41', ADULT, 'educational_level', 'EDUCATION LEVEL', 'IF ITEM 30 = 1, ITEM 41 MUST = 01-16,98',
+         affiliations=['1'], allowed=EDUCATION_LEVELS),
+    Edit('T1-038', '41', ADULT, 'family_affiliation', 'EDUCATION LEVEL', 'IF ITEM 41 = BLANK, ITEM 30 MUST = 5',
+         when={'educational_level': ['']}, allowed=['5']),
+    Edit('T1-040', '42', ADULT, 'family_affiliation', 'CITIZENSHIP/ALIENAGE', 'IF ITEM 42 = BLANK, ITEM 30 MUST = 5',
+         when={'citizenship_immigration_status': ['']}, allowed=['5']),
+    Edit('T1-041', '42', ADULT, 'citizenship_immigration_status', 'CITIZENSHIP/ALIENAGE',
+         'IF ITEM 30 = 1-4, ITEM 42 MUST = 1-2,9', affiliations=['1', '2', '3', '4'], allowed=['1', '2', '9']),
+    Edit('T1-042', '43', ADULT, 'coop_child_support', 'COOPERATION WITH CHILD SUPPORT', 'ITEM 43 MUST = 1-2, OR 9',
+         affiliations=['1', '2', '3', '4'], allowed=['1', '2', '9']),
+    Edit('T1-043', '43', ADULT, 'family_affiliation', 'COOPERATION WITH CHILD SUPPORT',
+         'IF ITEM 43 = BLANK, ITEM 30 MUST = 5', when={'coop_child_support': ['']}, allowed=['5']),
+    Edit('T1-045', '44', ADULT, 'countable_federal_time_limit_months',
+         'NUMBER OF MONTHS COUNTABLE TOWARDS FEDERAL TIME-LIMIT', 'IF ITEM 30 = 1 AND ITEM 38=1 OR 2, THEN ITEM 44 MUST => 0',
+         affiliations=['1'], when={'relationship_to_hoh': ['01', '02']}, required=True),
+    Edit('T1-050', '47', ADULT, 'employment_status', 'EMPLOYMENT STATUS', 'IF ITEM 30 = 1-4 THEN ITEM 47 MUST = 1-3',
+         affiliations=['1', '2', '3', '4'], allowed=['1', '2', '3']),
+    Edit('T1-051', '47', ADULT, 'family_affiliation', 'EMPLOYMENT STATUS', 'IF ITEM 47 = BLANK, ITEM 30 MUST = 5',
+         when={'employment_status': ['']}, allowed=['5']),
+    Edit('T1-052', '49', ADULT, 'work_participation_status', 'WORK PARTICIPATION STATUS',
+         'IF ITEM 30 = 1 or 2, THEN ITEM 49 MUST = 01-02, 05-19, or 99', affiliations=['1', '2'],
+         allowed=WORK_PARTICIPATION),
+    Edit('T1-053', '49', ADULT, 'work_participation_status', 'WORK PARTICIPATION STATUS',
+         'IF ITEM 30 = 3, 4, or 5, THEN ITEM 49 MUST = 99, OR BLANK', affiliations=['3', '4', '5'], allowed=['', '99']),
+    Edit('T1-054', '50', ADULT, 'unsubsidized_employment_hours', 'UNSUBSIDIZED EMPLOYMENT',
+         'IF ITEM 30 = 1, THEN ITEM 50 MUST => 0', affiliations=['1'], required=True),
+    Edit('T1-055', '51', ADULT, 'subsidized_private_employment_hours', 'SUBSIDIZED PVT EMPLOYMENT',
+         'IF ITEM 30 = 1, THEN ITEM 51 MUST => 0', affiliations=['1'], required=True),
+    Edit('T1-056', '52', ADULT, 'subsidized_public_employment_hours', 'SUBSIDIZED PUBLIC EMPLOYMENT',
+         'IF ITEM 30 = 1, THEN ITEM 52 MUST => 0', affiliations=['1'], required=True),
+    Edit('T1-058', '54', ADULT, 'on_job_training_hours', 'ON-THE-JOB TRAINING',
+         'IF ITEM 30 = 1, THEN ITEM 54 MUST => 0', affiliations=['1'], required=True),
+]
+
+CHILD_EDITS = [
+    Edit('T1-070', '67', CHILD, 'family_affiliation', 'FAMILY AFFILIATION -CHILD', 'ITEM 67 MUST = 1-5',
+         allowed=CHILD_AFFILIATIONS),
+    Edit('T1-071', '68', CHILD, 'date_of_birth', 'DATE OF BIRTH -CHILD', 'ITEM 68 MUST NOT BE BLANK OR ZEROES',
+         forbidden=['00000000'], required=True),
+    Edit('T1-072', '68', CHILD, 'family_affiliation', 'DATE OF BIRTH -CHILD', 'IF ITEM 68 = 99999999 ITEM 67 MUST = 2-5',
+         when={'date_of_birth': ['99999999']}, allowed=['2', '3', '4', '5']),
+    Edit('T1-073', '69', CHILD, 'ssn', 'SSN -CHILD', 'ITEM 69 MUST NOT BE BLANK', required=True),
+    Edit('T1-074', '69', CHILD, 'family_affiliation', 'SSN -CHILD', 'IF ITEM 69 = 999999999 ITEM 67 MUST = 2-5',
+         when={'ssn': ['999999999']}, allowed=['2', '3', '4', '5']),
+    *race_edits(CHILD, '70', 75, '67', ['1', '2', '3'], '1-3', ['4']),
+    Edit('T1-087', '73', CHILD, 'relation_to_hoh', 'RELATIONSHIP TO HEAD OF HOUSEHOLD', 'ITEM 73 MUST = 01-10',
+         allowed=RELATIONSHIPS),
+    Edit('T1-088', '74', CHILD, 'family_affiliation', 'PARENT WITH MINOR CHILD IN THE FAMILY',
+         'IF ITEM 74 = BLANK, ITEM 67 MUST = 4 OR 5', when={'parent_with_minor_child': ['']}, allowed=['4', '5']),
+    Edit('T1-089', '74', CHILD, 'parent_with_minor_child', 'PARENT WITH MINOR CHILD IN THE FAMILY',
+         'IF ITEM 67 = 1,2,3 , ITEM 74 MUST = 1-3', affiliations=['1', '2', '3'], allowed=['1', '2', '3']),
+    Edit('T1-090', '75', CHILD, 'educational_level', 'EDUCATION LEVEL', 'IF ITEM 67 = 2,3,5 ITEM 75 MUST = 01-16,98,99',
+         affiliations=['2', '3', '5'], allowed=EDUCATION_LEVELS + ['99']),
+    Edit('T1-091', '75', CHILD, 'educational_level', 'EDUCATION LEVEL', 'IF ITEM 67 = 1, ITEM 75 MUST = 01-16,98',
+         affiliations=['1'], allowed=EDUCATION_LEVELS),
+    Edit('T1-092', '75', CHILD, 'family_affiliation', 'EDUCATION LEVEL', 'IF ITEM 75 = BLANK, ITEM 67 MUST = 4',
+         when={'educational_level': ['']}, allowed=['4']),
+    Edit('T1-093', '76', CHILD, 'family_affiliation', 'CITIZENSHIP/ALIENAGE', 'IF ITEM 76 = BLANK, ITEM 67 MUST = 4',
+         when={'citizenship_immigration_status': ['']}, allowed=['4']),
+    Edit('T1-094', '76', CHILD, 'citizenship_immigration_status', 'CITIZENSHIP/ALIENAGE',
+         'IF ITEM 67 = 1-3,5, ITEM 76 MUST = 1-2,9', affiliations=['1', '2', '3', '5'], allowed=['1', '2', '9']),
+]
+
+EDITS = FAMILY_EDITS + ADULT_EDITS + CHILD_EDITS
+
+
+def catalog_version(edits=EDITS):
+    """A hash of every edit's definition; results found with another catalog must not be carried over."""
+    return hashlib.sha256(repr([sorted(vars(edit).items()) for edit in edits]).encode()).hexdigest()
+
+
+def edits_by_record_type(edits=EDITS):
+    """Group edits by the table they read, keeping catalog order within each group."""
+    groups = {}
+    for edit in edits:
+        groups.setdefault(edit.record_type, []).append(edit)
+    return groups
@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from itertools import groupby
+from operator import itemgetter
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+
+from .fingerprints import data_fingerprints
+from .layouts import T1, T2, T3, HEADER, TRAILER
+from .models import Family, Adult, Child, GeneratedFile, ExportSegment
+
+# Rows fetched per round trip while a month is streamed.
+CHUNK_SIZE = 2000
+
+
+def family_members(families, *members):
+    """Yield (family, [members of each queryset]...) with every queryset read once.
+
+    Rows are values_list() tuples whose first value is the family id: the pk
+    for ``families``, ordered by it, and family_id for each member queryset,
+    ordered by it. The member streams advance alongside the families, so only
+    one family's members are held in memory at a time.
+    """
+    streams = [groupby(queryset.iterator(chunk_size=CHUNK_SIZE), key=itemgetter(0)) for queryset in members]
+    heads = [next(stream, None) for stream in streams]
+    for family in families.iterator(chunk_size=CHUNK_SIZE):
+        groups = []
+        for index, stream in enumerate(streams):
+            group = []
+            while heads[index] is not None and heads[index][0] <= family[0]:
+                if heads[index][0] == family[0]:
+                    group = [row[1:] for row in heads[index][1]]
+                heads[index] = next(stream, None)
+            groups.append(group)
+        yield (family[1:], *groups)
+
+
+def month_records(month):
+    """Yield the T1/T2/T3 lines of one month, family by family.
+
+    A month costs three queries (families, adults, children) whatever the
+    number of cases, instead of a few per family. Rows stay plain tuples in
+    layout order and go straight into the layouts' precompiled formats.
+    """
+    case_number = T1.columns.index('case_number')
+    families = Family.objects.filter(month=month).order_by('pk').values_list('pk', *T1.columns)
+    adults = (Adult.objects.filter(family__month=month).order_by('family_id', 'pk')
+              .values_list('family_id', *T2.columns))
+    children = (Child.objects.filter(family__month=month).order_by('family_id', 'pk')
+                .values_list('family_id', *T3.columns))
+    for family, family_adults, family_children in family_members(families, adults, children):
+        keys = (month.report_month, family[case_number])
+        yield T1.encode_values(keys[:1], [family])
+        for adult in family_adults:
+            yield T2.encode_values(keys, [adult])
+        for index in range(0, len(family_children), 2):
+            yield T3.encode_values(keys, family_children[index:index + 2])
+
+
+def quarter_records(quarter):
+    """Yield the T1/T2/T3 lines of a quarter, month by month."""
+    for month in quarter.month_set.order_by('pk'):
+        yield from month_records(month)
+
+
+# Segments encoded with other layouts must not be reused.
+LAYOUT_VERSION = hashlib.sha256(repr([layout.formats for layout in (T1, T2, T3)]).encode()).hexdigest()
+
+
+def month_fingerprints(months):
+    """Map month id to a fingerprint of the month's data and of the layouts it would be encoded with."""
+    return {month_id: hashlib.sha256(f'{LAYOUT_VERSION}|{fingerprint}'.encode()).hexdigest()
+            for month_id, fingerprint in data_fingerprints(months).items()}
+
+
+def write_month(month, fingerprint, file):
+    """Write a month's records to ``file``, from its cached segment when the fingerprint still matches.
+
+    Otherwise the month is encoded, written to ``file`` and to a new segment
+    in the same pass, and the month's older segments are dropped.
+    """
+    segment = ExportSegment.objects.filter(month=month, fingerprint=fingerprint).first()
+    if segment is not None and segment.file.storage.exists(segment.file.name):
+        with segment.file.storage.open(segment.file.name, 'rb') as cached:
+            shutil.copyfileobj(io.TextIOWrapper(cached, encoding='utf-8', newline=''), file, 1024 * 1024)
+        return segment.record_count
+
+    segment = segment or ExportSegment(month=month, fingerprint=fingerprint)
+    record_count = 0
+    with storage_writer(segment, f'{month.report_month}.txt') as segment_file:
+        for record in month_records(month):
+            file.write(record)
+            file.write("\n")
+            segment_file.write(record)
+            segment_file.write("\n")
+            record_count += 1
+    segment.record_count = record_count
+    try:
+        with transaction.atomic():
+            segment.save()
+    except IntegrityError:
+        # A concurrent export cached the same month and fingerprint first; its segment is as good.
+        segment.file.delete(save=False)
+        return record_count
+    for stale in month.export_segments.exclude(pk=segment.pk):
+        stale.file.delete(save=False)
+        stale.delete()
+    return record_count
+
+
+def write_quarter(quarter, file, progress=None):
+    """Write a quarter's transmission (header, records, trailer) to a text file; returns the record count.
+
+    ``progress``, if given, is called with (months written, months in the quarter) after each month.
+    """
+    file.write("{} Processing records for Quarter ID {}\n".format(HEADER, quarter.pk))
+    months = list(quarter.month_set.order_by('pk'))
+    fingerprints = month_fingerprints(months)
+    record_count = 0
+    for done, month in enumerate(months, 1):
+        record_count += write_month(month, fingerprints[month.pk], file)
+        if progress:
+            progress(done, len(months))
+    file.write("{} Total Records Processed {}\n".format(TRAILER, record_count))
+    return record_count
+
+
+@contextmanager
+def text_writer(raw, compress=False):
+    """A text writer over the binary file ``raw``, gzip-compressed if asked; ``raw`` stays open."""
+    target = gzip.GzipFile(fileobj=raw, mode='wb') if compress else raw
+    writer = io.TextIOWrapper(target, encoding='utf-8', newline='\n')
+    try:
+        yield writer
+    finally:
+        writer.flush()
+        writer.detach()
+        if compress:
+            # Writes the gzip trailer; GzipFile leaves a passed-in fileobj open.
+            target.close()
+
+
+@contextmanager
+def storage_writer(instance, name, compress=False):
+    """A text file for ``instance.file``, written into its storage as ``name``.
+
+    With FileSystemStorage the text goes straight to the file's final
+    location, so nothing lands in the working directory and the file is not
+    read back to be copied. Other storages get it through a spooled temporary
+    file. Once the block completes, ``instance.file`` names the stored file
+    (the instance itself is not saved); if it fails, the partial file is removed.
+    """
+    field = instance.file.field
+    storage = field.storage
+    if isinstance(storage, FileSystemStorage):
+        while True:
+            stored_name = storage.get_available_name(field.generate_filename(instance, name),
+                                                     max_length=field.max_length)
+            path = storage.path(stored_name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                # 'x' fails if a concurrent export claimed the same name in the meantime.
+                raw = open(path, 'xb', buffering=1024 * 1024)
+                break
+            except FileExistsError:
+                continue
+        try:
+            with raw, text_writer(raw, compress) as file:
+                yield file
+        except BaseException:
+            storage.delete(stored_name)
+            raise
+        instance.file.name = stored_name
+    else:
+        with tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024) as raw:
+            with text_writer(raw, compress) as file:
+                yield file
+            raw.seek(0)
+            instance.file.save(name, File(raw), save=False)
+
+
+def save_quarter(quarter, name, user, compress=False, progress=None):
+    """Write a quarter's transmission into GeneratedFile storage and return the saved GeneratedFile."""
+    if compress:
+        name += '.gz'
+    generated_file = GeneratedFile(quarter=quarter, name=name, created_by=user)
+    with storage_writer(generated_file, name, compress) as file:
+        generated_file.record_count = write_quarter(quarter, file, progress)
+    generated_file.size = generated_file.file.size
+    generated_file.save()
+    return generated_file
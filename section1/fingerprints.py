@@ -0,0 +1,29 @@
+import hashlib
+
+from django.db.models import Count, Max
+
+from .models import Family, Adult, Child
+
+
+def data_fingerprints(months):
+    """Map month id to a fingerprint of its families, adults and children, in one query per table.
+
+    Any insert or edit moves a table's latest updated_at and any delete its
+    row count, so an unchanged fingerprint means the month holds the same
+    records. That only holds while every write stamps updated_at when it lands:
+    save() does, update() and bulk_update() do through StampedQuerySet (also in
+    data migrations), and the upload merge and TransmissionLoader stamp the
+    rows they write. Raw SQL that edits these tables must set updated_at itself.
+    The month's report_month is part of every encoded record, so renaming the
+    month changes the fingerprint too.
+    """
+    stats = {month.pk: [f'Month:{month.report_month}'] for month in months}
+    for model, month_field in ((Family, 'month_id'), (Adult, 'family__month_id'), (Child, 'family__month_id')):
+        rows = (model.objects.filter(**{f'{month_field}__in': list(stats)}).values(month_field)
+                .annotate(count=Count('pk'), updated=Max('updated_at')).order_by()
+                .values_list(month_field, 'count', 'updated'))
+        found = {month_id: (count, updated) for month_id, count, updated in rows}
+        for month_id, parts in stats.items():
+            count, updated = found.get(month_id, (0, None))
+            parts.append(f'{model.__name__}:{count}:{updated.isoformat() if updated else ""}')
+    return {month_id: hashlib.sha256('|'.join(parts).encode()).hexdigest() for month_id, parts in stats.items()}
@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 from django.forms.utils import ErrorList
 from django.core.exceptions import ValidationError
 from datetime import datetime
@@ -119,37 +120,42 @@ class AdultForm(forms.ModelForm):
 
     def clean(self):
         cleaned_data = super().clean()
-        for field_name, field_value in cleaned_data.items():
-            if field_value and isinstance(self.fields[field_name], forms.CharField):
-                if self._is_valid_integer(field_value):
-                    max_length = self.fields[field_name].max_length
+        self.normalize(cleaned_data, self.add_error)
+        return cleaned_data
+
+    @classmethod
+    def normalize(cls, cleaned_data, add_error):
+        # Shared with the bulk upload plan (ingest.IngestPlan), which has no form instance.
+        for field_name, field_value in list(cleaned_data.items()):
+            if field_value and isinstance(cls.base_fields[field_name], forms.CharField):
+                max_length = cls.base_fields[field_name].max_length
+                if cls._is_valid_integer(field_value):
                     cleaned_data[field_name] = field_value.zfill(max_length)
                 else:
-                    self.add_error(field_name, f"Value must be an integer and fit within its length of {max_length}.")
-
-        total_participation_value = int(cleaned_data['item59a_emped_hsd_participation']) + int(cleaned_data['item60a_schlattnd_participation']) + int(cleaned_data['item61a_chldcare_participation'])
-        cleaned_data['item59a_emped_hsd_participation'] = f"{total_participation_value:02d}"
-
-        total_excused_absences = int(cleaned_data['item59b_emped_hsd_excused_absences']) + int(cleaned_data['item60b_schlattnd_excused_absences']) + int(cleaned_data['item61b_chldcare_excused_absences'])
-        cleaned_data['item59b_emped_hsd_excused_absences'] = f"{total_excused_absences:02d}"
+                    add_error(field_name, f"Value must be an integer and fit within its length of {max_length}.")
 
-        total_holidays = int(cleaned_data['item59c_emped_hsd_holidays']) + int(cleaned_data['item60c_schlattnd_holidays']) + int(cleaned_data['item61c_chldcare_holidays'])
-        cleaned_data['item59c_emped_hsd_holidays'] = f"{total_holidays:02d}"
+        combined = [('item59a_emped_hsd_participation', 'item60a_schlattnd_participation', 'item61a_chldcare_participation'),
+                    ('item59b_emped_hsd_excused_absences', 'item60b_schlattnd_excused_absences', 'item61b_chldcare_excused_absences'),
+                    ('item59c_emped_hsd_holidays', 'item60c_schlattnd_holidays', 'item61c_chldcare_holidays')]
+        for fields in combined:
+            if all(field in cleaned_data for field in fields):
+                total = sum(int(cleaned_data[field]) for field in fields)
+                cleaned_data[fields[0]] = f"{total:02d}"
     
         dob = cleaned_data.get('date_of_birth')
-        if dob and not self._is_valid_dob_format(dob):
-            self.add_error('date_of_birth', "DOB must be in YYYYMMDD format and a valid date.")
+        if dob and not cls._is_valid_dob_format(dob):
+            add_error('date_of_birth', "DOB must be in YYYYMMDD format and a valid date.")
 
-        return cleaned_data
-
-    def _is_valid_integer(self, value):
+    @staticmethod
+    def _is_valid_integer(value):
         try:
             int_value = int(value)
             return True
         except ValueError:
             return False
         
-    def _is_valid_dob_format(self, dob):
+    @staticmethod
+    def _is_valid_dob_format(dob):
         try:
             datetime.strptime(dob, '%Y%m%d')
             return True
@@ -177,28 +183,34 @@ class ChildForm(forms.ModelForm):
     
     def clean(self):
         cleaned_data = super().clean()
-        for field_name, field_value in cleaned_data.items():
-            if field_value and isinstance(self.fields[field_name], forms.CharField):
-                if self._is_valid_integer(field_value):
-                    max_length = self.fields[field_name].max_length
+        self.normalize(cleaned_data, self.add_error)
+        return cleaned_data
+
+    @classmethod
+    def normalize(cls, cleaned_data, add_error):
+        # Shared with the bulk upload plan (ingest.IngestPlan), which has no form instance.
+        for field_name, field_value in list(cleaned_data.items()):
+            if field_value and isinstance(cls.base_fields[field_name], forms.CharField):
+                max_length = cls.base_fields[field_name].max_length
+                if cls._is_valid_integer(field_value):
                     cleaned_data[field_name] = field_value.zfill(max_length)
                 else:
-                    self.add_error(field_name, f"Value must be an integer and fit within its length of {max_length}.")
+                    add_error(field_name, f"Value must be an integer and fit within its length of {max_length}.")
 
         dob = cleaned_data.get('date_of_birth')
-        if dob and not self._is_valid_dob_format(dob):
-            self.add_error('date_of_birth', "DOB must be in YYYYMMDD format and a valid date.")
+        if dob and not cls._is_valid_dob_format(dob):
+            add_error('date_of_birth', "DOB must be in YYYYMMDD format and a valid date.")
 
-        return cleaned_data
-
-    def _is_valid_integer(self, value):
+    @staticmethod
+    def _is_valid_integer(value):
         try:
             int_value = int(value)
             return True
         except ValueError:
             return False
         
-    def _is_valid_dob_format(self, dob):
+    @staticmethod
+    def _is_valid_dob_format(dob):
         try:
             datetime.strptime(dob, '%Y%m%d')
             return True
@@ -207,6 +219,7 @@ class ChildForm(forms.ModelForm):
 
 class MonthSelectionForm(forms.Form):
     report_month = forms.ModelChoiceField(queryset=Month.objects.all().order_by('-report_month'), to_field_name="report_month", empty_label="Select a month")
+    incremental = forms.BooleanField(required=False, label="Only re-check records changed since the last run")
 
 class FileUploadForm(forms.Form):
     model = FileUpload
@@ -219,6 +232,8 @@ class FileUploadForm(forms.Form):
     ]
     model_type = forms.ChoiceField(choices=MODEL_CHOICES, required=True)
     file = forms.FileField()
+    upsert = forms.BooleanField(required=False, label="Update records already loaded for this month")
+    delete_missing = forms.BooleanField(required=False, label="Delete records of this type that are not in the file")
 
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
@@ -232,21 +247,32 @@ class FileUploadForm(forms.Form):
             MONTH_CHOICES = [(month.id, str(month)) for month in Month.objects.all()]
             self.fields['month'] = forms.ChoiceField(choices=MONTH_CHOICES)
 
-        self.order_fields(['month', 'model_type', 'file'])
+        self.order_fields(['month', 'model_type', 'file', 'upsert', 'delete_missing'])
 
     def clean_file(self):
         file = self.cleaned_data['file']
         if file:
-            if not (str(file.name).endswith('.csv') or str(file.name).endswith('.xls') or str(file.name).endswith('.xlsx')):
-                raise ValidationError("Unsupported file type. Please upload a .csv or .xls(x) file.")
-            if file.size > 5 * 1024 * 1024:  # 5MB limit
-                raise ValidationError("File size must be under 5MB")
+            if str(file.name).endswith('.xls'):
+                raise ValidationError("Old .xls workbooks are not supported. Please save the file as .xlsx.")
+            if not (str(file.name).endswith('.csv') or str(file.name).endswith('.xlsx')):
+                raise ValidationError("Unsupported file type. Please upload a .csv or .xlsx file.")
+            if file.size > settings.UPLOAD_MAX_SIZE:
+                raise ValidationError(f"File size must be under {settings.UPLOAD_MAX_SIZE // (1024 * 1024)}MB")
         return file
 
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('delete_missing') and not cleaned_data.get('upsert'):
+            self.add_error('delete_missing', "Deleting missing records is only available when updating.")
+        return cleaned_data
+
 class QuarterSelectionForm(forms.Form):
     #class Meta:
     #    model = Quarter
         #fields = ['report_quarter']
         #QUARTER_CHOICES = [(quarter.id, str(quarter)) for quarter in Quarter.objects.all()]
         #report_quarter = forms.ChoiceField(choices=QUARTER_CHOICES, required=True)
-    report_quarter = forms.ModelChoiceField(queryset=Quarter.objects.all().order_by('-id'), to_field_name="report_quarter", empty_label="Select a Quarter")
\ No newline at end of file
+    report_quarter = forms.ModelChoiceField(queryset=Quarter.objects.all().order_by('-id'), to_field_name="report_quarter", empty_label="Select a Quarter")
+
+class ProcessQuarterForm(QuarterSelectionForm):
+    compress = forms.BooleanField(required=False, label="Compress the file (gzip)")
@@ -0,0 +1,67 @@
+import pandas as pd
+from django.db.models.lookups import Exact, In, IsNull
+
+from .models import Month
+
+
+def load_frame(queryset):
+    """Read every concrete column of ``queryset`` into a DataFrame with a single query."""
+    columns = [field.attname for field in queryset.model._meta.concrete_fields]
+    return pd.DataFrame.from_records(list(queryset.values_list(*columns)), columns=columns)
+
+
+class Unsupported(Exception):
+    """A condition of the WHERE clause that has no DataFrame equivalent."""
+
+
+def build_mask(queryset, frame):
+    """Evaluate the WHERE clause of ``queryset`` against ``frame`` as a boolean mask.
+
+    exact, in and isnull lookups on the queryset's own columns, combined with
+    AND/OR and negated through exclude(), are evaluated on the frame. The report
+    month scope is already applied when the frame is loaded, so lookups on
+    Month.report_month are ignored. Any other condition (other lookup types,
+    lookups through other relations, expressions) is left to the database: the
+    queryset's primary keys are read back in one query and matched against the frame.
+    """
+    try:
+        return _node_mask(queryset.query.where, queryset.model, frame)
+    except Unsupported:
+        pk = queryset.model._meta.pk.attname
+        return frame[pk].isin(list(queryset.values_list('pk', flat=True)))
+
+
+def _node_mask(node, model, frame):
+    if not node.children:
+        mask = pd.Series(True, index=frame.index)
+    elif node.connector == 'OR':
+        mask = pd.Series(False, index=frame.index)
+        for child in node.children:
+            mask |= _child_mask(child, model, frame)
+    else:
+        mask = pd.Series(True, index=frame.index)
+        for child in node.children:
+            mask &= _child_mask(child, model, frame)
+    return ~mask if node.negated else mask
+
+
+def _child_mask(child, model, frame):
+    if hasattr(child, 'children'):
+        return _node_mask(child, model, frame)
+
+    target = getattr(getattr(child, 'lhs', None), 'target', None)
+    if target is None or hasattr(child.rhs, 'resolve_expression'):
+        raise Unsupported
+    if target.model is Month and target.name == 'report_month':
+        return pd.Series(True, index=frame.index)
+    if target.model is not model:
+        raise Unsupported
+
+    column = frame[target.attname]
+    if isinstance(child, IsNull):
+        return column.isna() if child.rhs else column.notna()
+    if isinstance(child, In):
+        return column.isin(list(child.rhs))
+    if isinstance(child, Exact):
+        return column == child.rhs
+    raise Unsupported
@@ -0,0 +1,856 @@
+import calendar
+import csv
+import datetime
+import hashlib
+import io
+import multiprocessing
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import django
+import openpyxl
+from django import forms
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.core.validators import MaxLengthValidator
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .forms import FamilyForm, AdultForm, ChildForm
+from .layouts import LAYOUTS, decode_line
+from .models import Quarter, Month, Family, Adult, Child, ImportError, ImportErrorSummary
+
+
+@contextmanager
+def open_text(uploaded_file, encoding='utf-8'):
+    """Decode an uploaded file as it is read instead of reading it into memory first.
+
+    Large uploads are spooled to a temporary file by Django; the wrapper pulls
+    one buffer at a time from it, so csv readers see lines without the file
+    ever being held in memory whole.
+    """
+    uploaded_file.seek(0)
+    text = io.TextIOWrapper(uploaded_file.file, encoding=encoding, newline='')
+    try:
+        yield text
+    finally:
+        # Leave the underlying file open so the upload can still be saved.
+        text.detach()
+
+
+def content_hash(uploaded_file):
+    """sha256 of an upload, read one chunk at a time."""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def is_workbook(uploaded_file):
+    return uploaded_file.name.lower().endswith('.xlsx')
+
+
+def open_workbook(uploaded_file):
+    """Open an .xlsx upload in read-only mode, which parses sheets as they are iterated."""
+    uploaded_file.seek(0)
+    return openpyxl.load_workbook(uploaded_file.file, read_only=True, data_only=True)
+
+
+def workbook_sheets(workbook, model_type):
+    """(model_type, worksheet) pairs to load, families first.
+
+    Sheets named after a model type (Family, Adult, Child) are loaded as that
+    type; a workbook without such sheets is loaded from its first sheet as
+    ``model_type``, like a CSV file.
+    """
+    by_type = {worksheet.title.strip().lower(): worksheet for worksheet in workbook.worksheets}
+    sheets = [(name, by_type[name]) for name in UPLOAD_FORMS if name in by_type]
+    return sheets or [(model_type, workbook.worksheets[0])]
+
+
+def cell_text(value):
+    # Rows are validated as text, the way they arrive from a CSV file; Excel
+    # stores whole numbers such as case numbers as floats.
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def sheet_headers(worksheet):
+    first = next(worksheet.iter_rows(max_row=1, values_only=True), ())
+    return [cell_text(value).strip() for value in first]
+
+
+def sheet_rows(worksheet):
+    """(sheet row number, dict row keyed by the header row) pairs; blank rows are skipped like csv does."""
+    headers = sheet_headers(worksheet)
+    for index, values in enumerate(worksheet.iter_rows(min_row=2, values_only=True), start=2):
+        if all(value is None for value in values):
+            continue
+        yield index, dict(zip(headers, map(cell_text, values)))
+
+
+def csv_rows(reader):
+    """(line number, dict row) pairs from a csv.DictReader.
+
+    The number is the physical line the row ends on, so blank lines and quoted
+    line breaks count the way parse_csv_parallel() counts them.
+    """
+    for row in reader:
+        yield reader.line_num, row
+
+
+class IngestPlan:
+    """Validation and normalization for one ModelForm, compiled once per upload.
+
+    Each row gets the same outcome FamilyForm & co. would give it (same error
+    messages and codes), plus the zero padding the model's save() applies, but
+    without building a form or a model instance per row. Values that pass the
+    cheap precompiled check are taken as they are; anything else goes through
+    the form field's own clean() so the error is exactly the form's.
+    """
+
+    def __init__(self, form_class):
+        form = form_class()
+        self.model = form._meta.model
+        # AdultForm and ChildForm pad, combine and check values in clean(); the
+        # same code runs here through their normalize() classmethod.
+        self.normalize = getattr(form_class, 'normalize', None)
+        padded = set(getattr(self.model, 'ZERO_PADDED_FIELDS', ()))
+        self.fields = []
+        for name, field in form.fields.items():
+            if isinstance(field, forms.ModelChoiceField):
+                # Foreign keys (the family of an adult or child) are resolved by the loader.
+                continue
+            if isinstance(field, forms.ChoiceField):
+                choices = {str(key) for key, _ in field.choices if key not in field.empty_values}
+            else:
+                choices = None
+            max_length = self.model._meta.get_field(name).max_length
+            self.fields.append((name, field, choices, max_length, name in padded))
+        self.names = {name for name, *_ in self.fields}
+
+    def clean(self, row):
+        """Return (values, errors); errors is {field: [{'message': ..., 'code': ...}]} as in form.errors."""
+        values = {}
+        errors = {}
+        for name, field, choices, max_length, padded in self.fields:
+            raw = row.get(name)
+            if choices is not None:
+                value = '' if raw is None else raw
+                ok = value in choices
+            else:
+                value = '' if raw is None else (raw.strip() if field.strip else raw)
+                ok = (value or not field.required) and len(value) <= max_length and '\x00' not in value
+            if not ok:
+                try:
+                    value = field.clean(raw)
+                except forms.ValidationError as error:
+                    # A field can fail several validators at once; each keeps its own code.
+                    errors[name] = [{'message': message, 'code': item.code or ''}
+                                    for item in error.error_list for message in item.messages]
+                    continue
+            if padded:
+                try:
+                    int(value)
+                except ValueError:
+                    errors[name] = [{'message': f"The value of {name} must be an integer and fit within its "
+                                                f"length  of {max_length}.", 'code': 'invalid'}]
+                    continue
+                value = value.zfill(max_length)
+            values[name] = value
+
+        if self.normalize is not None:
+            def add_error(name, message):
+                values.pop(name, None)
+                errors.setdefault(name or NON_FIELD_ERRORS, []).append({'message': message, 'code': ''})
+            self.normalize(values, add_error)
+            # Model validation runs after clean(), and combined totals can outgrow a field.
+            for name, field, choices, max_length, padded in self.fields:
+                if name in values and len(values[name]) > max_length:
+                    error = forms.ValidationError(MaxLengthValidator.message, code='max_length', params={
+                        'limit_value': max_length, 'show_value': len(values.pop(name))})
+                    errors[name] = [{'message': message, 'code': error.code} for message in error.messages]
+        return values, errors
+
+
+class InsertStatement:
+    """A prepared INSERT of every concrete column of ``model`` but the primary key.
+
+    Columns a row does not supply get ``values`` (month, created_by, ...),
+    the auto_now timestamps or the field default, converted for the database
+    once instead of once per row.
+    """
+
+    def __init__(self, model, values):
+        opts = model._meta
+        self.columns = [field for field in opts.concrete_fields if not field.primary_key]
+        self.stamps = [field for field in self.columns
+                       if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+        constants = {}
+        for field in self.columns:
+            if field not in self.stamps:
+                # What a fresh model instance would hold, e.g. '' for text fields the form leaves out.
+                constants[field.attname] = field.get_default()
+        for name, value in values.items():
+            field = opts.get_field(name)
+            constants[field.attname] = value.pk if isinstance(value, models.Model) else value
+        self.constants = {field.attname: field.get_db_prep_save(constants[field.attname], connection)
+                          for field in self.columns if field.attname in constants}
+        self.stamp()
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(opts.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in self.columns),
+            ', '.join(['%s'] * len(self.columns)))
+
+    def stamp(self):
+        """Give the auto_now and auto_now_add columns of rows built from here on the current time."""
+        now = timezone.now()
+        for field in self.stamps:
+            self.constants[field.attname] = field.get_db_prep_save(now, connection)
+
+    def row(self, values):
+        """The parameter tuple for one row given its own values by attname."""
+        return tuple(values[field.attname] if field.attname in values else self.constants.get(field.attname)
+                     for field in self.columns)
+
+    def execute(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(self.sql, rows)
+
+
+class StagingTable:
+    """A TEMP table shaped like ``model``'s table, private to this connection.
+
+    Rows collect here while a file is parsed; merge() moves them into the live
+    table with one INSERT ... SELECT, plus one UPDATE ... FROM for staged rows
+    that carry the pk of a stored row they replace. The live table is only
+    written to, and locked, for as long as the merge takes. The auto_now and
+    auto_now_add columns get the time of the merge, not the staged values.
+
+    With ``lines``, each staged row also keeps the line it came from, so rows
+    take() removes before the merge can be reported against the file.
+    """
+
+    def __init__(self, model, name, lines=False):
+        opts = model._meta
+        quote = connection.ops.quote_name
+        self.live = quote(opts.db_table)
+        self.table = quote(name)
+        self.pk = quote(opts.pk.column)
+        fields = [field for field in opts.concrete_fields if not field.primary_key]
+        self.columns = [quote(field.column) for field in fields]
+        self.attnames = [field.attname for field in fields]
+        self.references = [(quote(field.column), quote(field.related_model._meta.db_table),
+                            quote(field.target_field.column)) for field in fields if field.is_relation]
+        # Column -> field for the timestamps merge() stamps; auto_now_add only on insert.
+        self.inserted_stamps = {quote(field.column): field for field in fields
+                                if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)}
+        self.updated_stamps = {quote(field.column): field for field in fields if getattr(field, 'auto_now', False)}
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+            cursor.execute(f'CREATE TEMPORARY TABLE {self.table} AS SELECT * FROM {self.live} WHERE 1 = 0')
+            if lines:
+                cursor.execute(f'ALTER TABLE {self.table} ADD COLUMN source_line integer')
+        staged = [self.pk, *self.columns, *(['source_line'] if lines else [])]
+        self.insert_sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            self.table, ', '.join(staged), ', '.join(['%s'] * len(staged)))
+
+    def add(self, rows):
+        """Stage (pk, *columns) tuples, plus the source line with ``lines``; pk is None for new rows."""
+        # Only the TEMP table is written, so this takes no lock on the live tables.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(self.insert_sql, rows)
+
+    def merge(self, update_columns=()):
+        now = timezone.now()
+        selected = []
+        params = []
+        for column in self.columns:
+            field = self.inserted_stamps.get(column)
+            selected.append(column if field is None else '%s')
+            if field is not None:
+                params.append(field.get_db_prep_save(now, connection))
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {self.live} ({", ".join(self.columns)}) SELECT {", ".join(selected)} '
+                           f'FROM {self.table} WHERE {self.pk} IS NULL', params)
+            if update_columns:
+                assignments = []
+                params = []
+                for column in update_columns:
+                    field = self.updated_stamps.get(column)
+                    assignments.append(f'{column} = staged.{column}' if field is None else f'{column} = %s')
+                    if field is not None:
+                        params.append(field.get_db_prep_save(now, connection))
+                cursor.execute(f'UPDATE {self.live} SET {", ".join(assignments)} FROM {self.table} AS staged '
+                               f'WHERE {self.live}.{self.pk} = staged.{self.pk}', params)
+
+    def take(self, condition):
+        """Remove the staged rows matching ``condition``; returns their (line, pk, {attname: value}).
+
+        ``condition`` is SQL on a staged row aliased ``staged``, see
+        missing_references(), stored_keys() and stale_updates().
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT source_line, {self.pk}, {", ".join(self.columns)} FROM {self.table} AS staged '
+                           f'WHERE {condition} ORDER BY source_line')
+            rows = [(line, pk, dict(zip(self.attnames, values))) for line, pk, *values in cursor.fetchall()]
+            if rows:
+                cursor.execute(f'DELETE FROM {self.table} AS staged WHERE {condition}')
+        return rows
+
+    def missing_references(self):
+        """Rows pointing at a record (e.g. a family) that is no longer stored."""
+        return ' OR '.join(f'(staged.{column} IS NOT NULL AND NOT EXISTS '
+                           f'(SELECT 1 FROM {table} WHERE {table}.{target} = staged.{column}))'
+                           for column, table, target in self.references) or '1 = 0'
+
+    def stored_keys(self, key_columns):
+        """New rows whose key is stored in the live table."""
+        match = ' AND '.join(f'{self.live}.{column} = staged.{column}' for column in key_columns)
+        return f'staged.{self.pk} IS NULL AND EXISTS (SELECT 1 FROM {self.live} WHERE {match})'
+
+    def stale_updates(self, key_columns):
+        """Updates whose stored row is gone or no longer has the key it was matched on."""
+        match = ' AND '.join(f'{self.live}.{column} = staged.{column}'
+                             for column in (self.pk, *key_columns))
+        return f'staged.{self.pk} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {self.live} WHERE {match})'
+
+    def drop(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+
+class BulkLoader:
+    """Stages rows that pass an IngestPlan in batches; rejected rows become ImportError rows.
+
+    bulk_create compiles every field of every instance into SQL, which costs
+    more than the parsing and validation together, so good rows are written
+    as plain tuples through one prepared INSERT run with executemany. They go
+    to per-upload staging tables first and reach the live tables in a single
+    short merge at the end, so a long upload never holds their write lock.
+    """
+
+    def __init__(self, plan, upload, user, defaults, batch_size=1000, unique_together=(), existing=None,
+                 upsert=False, delete_missing=False, model_type=None):
+        self.plan = plan
+        self.model = plan.model
+        self.upload = upload
+        # A workbook upload loads several model types; rejected rows are tagged with their own.
+        self.model_type = model_type or upload.model_type
+        self.user = user
+        # Values every record gets (month, ...), on top of the row's own.
+        self.defaults = defaults
+        self.batch_size = batch_size
+        # The form's validate_unique, checked against keys already stored for the
+        # month (``existing``) plus the ones loaded from this file so far.
+        self.unique_together = unique_together
+        self.unique_attnames = [self.model._meta.get_field(name).attname for name in unique_together]
+        # In upsert mode a stored key is not an error: the row replaces the stored
+        # one if its contents differ. ``stored`` maps each key to (pk, values).
+        self.upsert = upsert
+        self.delete_missing = delete_missing
+        if delete_missing and not upsert:
+            raise ValueError("delete_missing needs upsert mode.")
+        self.names = [name for name, *_ in plan.fields]
+        self.stored = {}
+        self.seen = set()
+        self.mentioned = set()
+        if existing is not None and upsert:
+            width = len(self.unique_attnames)
+            for pk, *values in existing.values_list('pk', *self.unique_attnames, *self.names).iterator():
+                self.stored[tuple(values[:width])] = (pk, tuple(values[width:]))
+        elif existing is not None:
+            self.seen = set(existing.values_list(*self.unique_attnames))
+        # Called inside the merge transaction, once this loader's rows are in.
+        self.after_merge = None
+        self.compile_insert()
+        self.pending = []
+        self.updates = []
+        self.errors = []
+        self.error_counts = Counter()
+        self.loaded = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.rejected = 0
+
+    def compile_insert(self):
+        opts = self.model._meta
+        self.insert = InsertStatement(self.model, dict(self.defaults, created_by=self.user, updated_by=self.user))
+        self.constants = self.insert.constants
+        # Changed rows get their form fields rewritten and updated_at/updated_by
+        # bumped, which is also what incremental validation keys on; the merge
+        # stamps updated_at with its own time.
+        self.update_columns = [connection.ops.quote_name(opts.get_field(name).column)
+                               for name in (*self.names, 'updated_at', 'updated_by')]
+        self.error_insert = InsertStatement(ImportError, {
+            'upload': self.upload, 'model_type': self.model_type, 'created_by': self.user, 'updated_by': self.user})
+        suffix = f'{opts.model_name}_{self.upload.pk}'
+        self.staging = StagingTable(self.model, f'staging_{suffix}', lines=True)
+        self.staged_errors = StagingTable(ImportError, f'staging_errors_{suffix}')
+
+    def resolve(self, row, errors):
+        """Per-row values by attname that do not come from the form (e.g. family_id)."""
+        return {}
+
+    def add(self, line_number, row):
+        self.accept(line_number, row, *self.plan.clean(row))
+
+    def accept(self, line_number, row, values, errors):
+        """Store a row already run through the plan (here or in a parsing worker)."""
+        values.update(self.resolve(row, errors))
+        key = None
+        if self.unique_attnames:
+            key = tuple(values.get(name, self.constants.get(name)) for name in self.unique_attnames)
+            # A rejected row still keeps its stored record from being deleted as missing.
+            self.mentioned.add(key)
+            if None not in key and key in self.seen:
+                errors[NON_FIELD_ERRORS] = [{'message': self.unique_message(), 'code': 'unique_together'}]
+        if errors:
+            self.reject(line_number, row, errors)
+            return
+        if key is not None:
+            self.seen.add(key)
+        if key in self.stored:
+            pk, old = self.stored[key]
+            new = tuple(values[name] for name in self.names)
+            if new == old:
+                self.unchanged += 1
+            else:
+                self.updates.append((pk, *self.insert.row(values), line_number))
+                self.updated += 1
+                if len(self.updates) >= self.batch_size:
+                    self.flush()
+            return
+        self.pending.append((None, *self.insert.row(values), line_number))
+        self.loaded += 1
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def unique_message(self):
+        # The message Django's validate_unique would give for unique_together.
+        opts = self.model._meta
+        names = [str(opts.get_field(name).verbose_name).capitalize() for name in self.unique_together]
+        return f"{str(opts.verbose_name).capitalize()} with this {' and '.join(names)} already exists."
+
+    def reject(self, line_number, row, errors):
+        data = ImportError.pack(row, errors)
+        self.errors.append((None, *self.error_insert.row({'line': line_number, 'data': data})))
+        for field, messages in errors.items():
+            for message in messages:
+                self.error_counts[(field, message['code'])] += 1
+        self.rejected += 1
+        if len(self.errors) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending or self.updates:
+            self.staging.add(self.pending + self.updates)
+            self.pending = []
+            self.updates = []
+        if self.errors:
+            self.staged_errors.add(self.errors)
+            self.errors = []
+
+    def load(self, rows):
+        """Load (line_number, row) pairs, e.g. from csv_rows() or sheet_rows(); the header is line 1."""
+        for line_number, row in rows:
+            self.add(line_number, row)
+        return self.finish()
+
+    def load_parsed(self, parsed):
+        """Load (line_number, row, values, errors) tuples, e.g. from parse_csv_parallel().
+
+        If ``parsed`` raises (e.g. SplitRecord), nothing was merged and the
+        staging tables are dropped, so the file can be loaded again another way.
+        """
+        try:
+            for line_number, row, values, errors in parsed:
+                self.accept(line_number, row, values, errors)
+        except BaseException:
+            self.drop_staging()
+            raise
+        return self.finish()
+
+    def finish(self):
+        try:
+            self.flush()
+            with transaction.atomic():
+                self.recheck()
+                self.staging.merge(self.update_columns if self.updated else ())
+                self.staged_errors.merge()
+                ImportErrorSummary.objects.bulk_create([
+                    ImportErrorSummary(upload=self.upload, model_type=self.model_type, field=field, code=code,
+                                       count=count)
+                    for (field, code), count in self.error_counts.items()])
+                if self.delete_missing:
+                    self.delete_unseen()
+                if self.after_merge is not None:
+                    self.after_merge()
+        finally:
+            self.drop_staging()
+        return self.loaded, self.rejected
+
+    def drop_staging(self):
+        self.staging.drop()
+        self.staged_errors.drop()
+
+    def recheck(self):
+        """Reject staged rows that writes committed since the loader was built conflict with.
+
+        Stored keys and rows were read when the loader was built; another upload
+        or a form may have added, changed or deleted records since. Run in the
+        merge transaction, so what it finds holds until the merge commits.
+        """
+        opts = self.model._meta
+        key_columns = [connection.ops.quote_name(opts.get_field(name).column) for name in self.unique_together]
+        checks = [(self.staging.missing_references(), self.missing_reference_errors)]
+        if key_columns:
+            name = str(opts.verbose_name)
+            checks += [
+                (self.staging.stored_keys(key_columns), lambda values: {NON_FIELD_ERRORS: [
+                    {'message': self.unique_message(), 'code': 'unique_together'}]}),
+                (self.staging.stale_updates(key_columns), lambda values: {NON_FIELD_ERRORS: [
+                    {'message': f"The stored {name} was changed or deleted while this file was loading.",
+                     'code': 'stale'}]}),
+            ]
+        for condition, errors in checks:
+            for line_number, pk, values in self.staging.take(condition):
+                if pk is None:
+                    self.loaded -= 1
+                else:
+                    self.updated -= 1
+                self.reject(line_number, self.staged_row(values), errors(values))
+        self.flush()
+
+    def staged_row(self, values):
+        """The file row a staged row came from, as far as it can be rebuilt, for its ImportError."""
+        return {name: values[name] for name in self.names}
+
+    def missing_reference_errors(self, values):
+        return {NON_FIELD_ERRORS: [{'message': "A record this row refers to was deleted while this file was loading.",
+                                    'code': 'stale'}]}
+
+    def delete_unseen(self):
+        # Stored rows the file no longer mentions; deleting goes through the ORM
+        # so dependent adults, children and validation results go with them.
+        missing = [pk for key, (pk, _) in self.stored.items() if key not in self.mentioned]
+        for start in range(0, len(missing), self.batch_size):
+            self.model.objects.filter(pk__in=missing[start:start + self.batch_size]).delete()
+        self.deleted = len(missing)
+
+
+def family_index(months):
+    """Map (month_id, case_number) to family id for every family in ``months``, in one query."""
+    families = Family.objects.filter(month__in=months).values_list('month_id', 'case_number', 'pk')
+    return {(month_id, case_number): pk for month_id, case_number, pk in families}
+
+
+def normalize_case_number(value):
+    # Family.save() stores case numbers zero-padded; files often drop the zeros.
+    value = (value or '').strip()
+    return value.zfill(Family._meta.get_field('case_number').max_length) if value.isdigit() else value
+
+
+class MemberLoader(BulkLoader):
+    """Adult and Child rows name their family by case number; it is resolved through family_index."""
+
+    def __init__(self, plan, upload, user, month, families=None, **kwargs):
+        kwargs.setdefault('unique_together', ('family', 'ssn'))
+        kwargs.setdefault('existing', plan.model.objects.filter(family__month=month))
+        super().__init__(plan, upload, user, {}, **kwargs)
+        self.month = month
+        self.families = family_index([month]) if families is None else families
+        # family_id -> case number, built if a staged row has to be reported, see recheck().
+        self.case_numbers = None
+
+    def resolve(self, row, errors):
+        case_number = normalize_case_number(row.get('case_number'))
+        family_id = self.families.get((self.month.pk, case_number))
+        if family_id is None:
+            errors['case_number'] = [{'message': f"No family with case number {case_number} in {self.month}.",
+                                      'code': 'invalid_choice'}]
+            return {}
+        return {'family_id': family_id}
+
+    def staged_row(self, values):
+        if self.case_numbers is None:
+            self.case_numbers = {pk: case_number for (month_id, case_number), pk in self.families.items()}
+        return dict(super().staged_row(values), case_number=self.case_numbers.get(values['family_id'], ''))
+
+    def missing_reference_errors(self, values):
+        # Most likely the family; reported the way resolve() reports an unknown one.
+        row = self.staged_row(values)
+        return {'case_number': [{'message': f"No family with case number {row['case_number']} in {self.month}.",
+                                 'code': 'invalid_choice'}]}
+
+
+UPLOAD_FORMS = {'family': FamilyForm, 'adult': AdultForm, 'child': ChildForm}
+
+
+def expected_headers(form_class):
+    # Adult and Child files carry the family's case number instead of its id.
+    fields = list(form_class.Meta.fields)
+    if 'family' in fields:
+        fields = ['case_number'] + [field for field in fields if field != 'family']
+    return fields
+
+
+def make_loader(model_type, upload, user, month, **kwargs):
+    plan = IngestPlan(UPLOAD_FORMS[model_type])
+    kwargs['model_type'] = model_type
+    if model_type == 'family':
+        return BulkLoader(plan, upload, user, {'month': month}, unique_together=('month', 'case_number'),
+                          existing=Family.objects.filter(month=month), **kwargs)
+    return MemberLoader(plan, upload, user, month, **kwargs)
+
+
+def get_or_create_month(report_month):
+    """The Month for a YYYYMM string, creating it and its Quarter on first use."""
+    year, number = int(report_month[:4]), int(report_month[4:])
+    quarter_number = (number - 1) // 3 + 1
+    last_month = quarter_number * 3
+    quarter, _ = Quarter.objects.get_or_create(
+        report_quarter=f'{year}Q{quarter_number}',
+        defaults={'start_date': datetime.date(year, last_month - 2, 1),
+                  'end_date': datetime.date(year, last_month, calendar.monthrange(year, last_month)[1])})
+    month, _ = Month.objects.get_or_create(
+        report_month=report_month,
+        defaults={'quarter': quarter, 'start_date': datetime.date(year, number, 1),
+                  'end_date': datetime.date(year, number, calendar.monthrange(year, number)[1])})
+    return month
+
+
+class TransmissionLoader:
+    """Loads a fixed-width T1/T2/T3 transmission file, as export.write_quarter writes it.
+
+    Lines are decoded with the shared layouts and inserted in batches through
+    prepared INSERTs; Header and Trailer lines are skipped and any other line
+    that is not a well-formed record stops the load. Adults and children
+    name their family by report month and case number, so pending families are
+    written (and their ids read back) before the members that follow them.
+    The whole file loads in one transaction: a bad line leaves nothing behind.
+    """
+
+    def __init__(self, user, batch_size=1000):
+        self.user = user
+        self.batch_size = batch_size
+        self.inserts = {model: InsertStatement(model, {'created_by': user, 'updated_by': user})
+                        for model in (Family, Adult, Child)}
+        self.months = {}
+        self.families = {}
+        self.pending_families = []
+        self.pending_members = []
+        self.counts = {Family: 0, Adult: 0, Child: 0}
+
+    def month(self, report_month):
+        month = self.months.get(report_month)
+        if month is None:
+            month = self.months[report_month] = get_or_create_month(report_month)
+            # Members may belong to families loaded earlier, e.g. from a Family CSV.
+            self.families.update(family_index([month]))
+        return month
+
+    def add(self, line_number, line):
+        try:
+            decoded = decode_line(line)
+        except ValueError as error:
+            raise ValueError(f"Line {line_number}: {error}") from None
+        if decoded is not None:
+            self.accept(line_number, *decoded)
+
+    def accept(self, line_number, layout, keys, records):
+        month = self.month(keys['report_month'])
+        if layout.model is Family:
+            values = dict(records[0], month_id=month.pk)
+            key = (month.pk, values['case_number'])
+            if key in self.families:
+                raise ValueError(f"Line {line_number}: family {values['case_number']} of {month} is already loaded.")
+            self.families[key] = None
+            self.pending_families.append(values)
+        else:
+            key = (month.pk, keys['case_number'])
+            if key not in self.families:
+                raise ValueError(f"Line {line_number}: no family {keys['case_number']} in {month}.")
+            self.pending_members.extend((layout.model, key, values) for values in records)
+        if len(self.pending_families) + len(self.pending_members) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Stamped as each batch is written, not when the loader was built.
+        for insert in self.inserts.values():
+            insert.stamp()
+        if self.pending_families:
+            insert = self.inserts[Family]
+            insert.execute([insert.row(values) for values in self.pending_families])
+            self.counts[Family] += len(self.pending_families)
+            month_ids = {values['month_id'] for values in self.pending_families}
+            case_numbers = [values['case_number'] for values in self.pending_families]
+            for month_id, case_number, pk in Family.objects.filter(
+                    month_id__in=month_ids, case_number__in=case_numbers).values_list('month_id', 'case_number', 'pk'):
+                self.families[(month_id, case_number)] = pk
+            self.pending_families = []
+        if self.pending_members:
+            rows = {Adult: [], Child: []}
+            for model, key, values in self.pending_members:
+                values['family_id'] = self.families[key]
+                rows[model].append(self.inserts[model].row(values))
+            for model, model_rows in rows.items():
+                if model_rows:
+                    self.inserts[model].execute(model_rows)
+                    self.counts[model] += len(model_rows)
+            self.pending_members = []
+
+    def load(self, lines):
+        """Load an iterable of lines (an open text file works); returns the counts per model."""
+        with transaction.atomic():
+            for line_number, line in enumerate(lines, start=1):
+                self.add(line_number, line.rstrip('\r\n'))
+            self.flush()
+        return self.counts
+
+    def load_parsed(self, parsed):
+        """Load (line_number, record_type, keys, records) tuples from parse_transmission_parallel()."""
+        with transaction.atomic():
+            for line_number, record_type, keys, records in parsed:
+                self.accept(line_number, LAYOUTS[record_type], keys, records)
+            self.flush()
+        return self.counts
+
+
+# Parallel parsing: a large file is cut into byte ranges that end on a line
+# break, worker processes decode and validate the ranges, and the caller's
+# single writer gets the results back in file order. Writing stays in one
+# process, so uniqueness checks, family lookups and line numbers behave as in
+# a sequential load. Ranges are cut at any newline, so a CSV record with a
+# quoted line break may be split; workers raise SplitRecord when they see one
+# and the caller loads the file sequentially instead.
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class SplitRecord(Exception):
+    """A CSV record spans a line break, so the file cannot be parsed in ranges cut at newlines."""
+
+
+def record_ranges(path, start=0, chunk_size=CHUNK_SIZE):
+    """(start, end) byte offsets covering the file from ``start``, each ending just after a newline."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                file.seek(end)
+                # Finish the line the boundary fell in.
+                file.readline()
+                end = file.tell()
+            yield start, end
+            start = end
+
+
+def read_range(path, start, end, encoding='utf-8'):
+    # A range ends on b'\n', which never occurs inside a multi-byte UTF-8 character.
+    with open(path, 'rb') as file:
+        file.seek(start)
+        return file.read(end - start).decode(encoding)
+
+
+def map_ranges(function, path, workers, args=(), start=0, chunk_size=CHUNK_SIZE):
+    """Yield ``function(path, *args, start, end)`` for each range of the file, in file order.
+
+    Only a couple of ranges per worker are in flight at a time, so parsed rows
+    never pile up in memory ahead of the writer.
+    """
+    # The writer is usually inside a transaction by now, so workers are spawned
+    # rather than forked: a forked child would share its open connection.
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        pending = deque()
+        for range_start, range_end in record_ranges(path, start, chunk_size):
+            pending.append(pool.submit(function, path, *args, range_start, range_end))
+            if len(pending) > workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+_plans = {}
+
+
+def parse_csv_range(path, model_type, fieldnames, start, end):
+    """Worker side: run one range of a CSV file through the model type's IngestPlan.
+
+    Returns the number of lines in the range and (line, row, values, errors)
+    tuples with line numbers counted from the start of the range. Raises
+    SplitRecord for a row with a line break in a field (a quoted one, or one
+    left open where the range was cut) or with more or fewer fields than the header.
+    """
+    plan = _plans.get(model_type)
+    if plan is None:
+        plan = _plans[model_type] = IngestPlan(UPLOAD_FORMS[model_type])
+    # Clean rows only send back the columns the plan leaves to the loader (the
+    # case number of adults and children); the whole row is kept for rejects.
+    others = [name for name in fieldnames if name not in plan.names]
+    text = read_range(path, start, end)
+    reader = csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames)
+    parsed = []
+    for row in reader:
+        if None in row or any(value is None or '\n' in value or '\r' in value for value in row.values()):
+            raise SplitRecord(f"The record ending on line {reader.line_num} of bytes {start}-{end} "
+                              f"is not one line with one field per column.")
+        values, errors = plan.clean(row)
+        if not errors:
+            row = {name: row.get(name) for name in others}
+        parsed.append((reader.line_num, row, values, errors))
+    return reader.line_num, parsed
+
+
+def parse_csv_parallel(path, model_type, workers, chunk_size=CHUNK_SIZE):
+    """Parsed rows of a CSV file for BulkLoader.load_parsed(), with the line numbers a sequential load gives."""
+    with open(path, 'rb') as file:
+        header = file.readline()
+    fieldnames = next(csv.reader([header.decode('utf-8')]))
+    # Line 1 is the header.
+    lines_before = 1
+    for line_count, parsed in map_ranges(parse_csv_range, path, workers, (model_type, fieldnames),
+                                         start=len(header), chunk_size=chunk_size):
+        for line_number, row, values, errors in parsed:
+            yield lines_before + line_number, row, values, errors
+        lines_before += line_count
+
+
+def parse_transmission_range(path, start, end):
+    """Worker side: decode one range of a transmission file.
+
+    A line that does not decode ends the range with (line, None, message, None),
+    so the writer can report it with its line number in the whole file.
+    """
+    text = read_range(path, start, end)
+    lines = text.splitlines()
+    parsed = []
+    for index, line in enumerate(lines, start=1):
+        try:
+            decoded = decode_line(line)
+        except ValueError as error:
+            parsed.append((index, None, str(error), None))
+            break
+        if decoded is not None:
+            layout, keys, records = decoded
+            parsed.append((index, layout.record_type, keys, records))
+    return len(lines), parsed
+
+
+def parse_transmission_parallel(path, workers, chunk_size=CHUNK_SIZE):
+    """Decoded records of a transmission file for TransmissionLoader.load_parsed()."""
+    lines_before = 0
+    for line_count, parsed in map_ranges(parse_transmission_range, path, workers, chunk_size=chunk_size):
+        for line_number, record_type, keys, records in parsed:
+            if record_type is None:
+                raise ValueError(f"Line {lines_before + line_number}: {keys}")
+            yield lines_before + line_number, record_type, keys, records
+        lines_before += line_count
@@ -0,0 +1,110 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .export import save_quarter
+from .models import BackgroundJob, Month, Quarter
+from .tasks import DataValidator, next_version
+
+# Jobs are rows in BackgroundJob; `manage.py run_jobs` claims pending rows one at a
+# time and runs the handler registered for their job_type. The database is the
+# only queue, so nothing else has to be running next to the web server.
+
+VALIDATION = 'validation'
+QUARTER_EXPORT = 'quarter_export'
+
+HANDLERS = {}
+
+
+def handler(job_type):
+    def register(func):
+        HANDLERS[job_type] = func
+        return func
+    return register
+
+
+def enqueue(job_type, user, **params):
+    if job_type not in HANDLERS:
+        raise ValueError(f"Unknown job type '{job_type}'.")
+    return BackgroundJob.objects.create(job_type=job_type, params=params, created_by=user)
+
+
+def fail_stale_jobs():
+    """Mark running jobs that stopped reporting progress for JOB_TIMEOUT seconds as failed.
+
+    A worker that dies mid-job leaves it running forever otherwise, and the
+    pages polling it never stop. Jobs are not re-run, since the crash may
+    well happen again; they can be queued anew.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.JOB_TIMEOUT)
+    return BackgroundJob.objects.filter(status=BackgroundJob.RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    ).update(status=BackgroundJob.FAILED, finished_at=now,
+             error=f"Worker stopped responding: no progress for {settings.JOB_TIMEOUT} seconds.")
+
+
+def claim_next():
+    """Mark the oldest pending job as running and return it, or None if the queue is empty."""
+    fail_stale_jobs()
+    for job in BackgroundJob.objects.filter(status=BackgroundJob.PENDING).order_by('created_at', 'pk'):
+        # The conditional update keeps two workers from picking up the same job.
+        now = timezone.now()
+        claimed = BackgroundJob.objects.filter(pk=job.pk, status=BackgroundJob.PENDING).update(
+            status=BackgroundJob.RUNNING, started_at=now, heartbeat_at=now)
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_job(job):
+    try:
+        job.result = HANDLERS[job.job_type](job) or {}
+        job.status = BackgroundJob.DONE
+    except Exception:
+        job.status = BackgroundJob.FAILED
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def record_progress(job, steps_done, steps_total, errors_found=0):
+    job.steps_done = steps_done
+    job.steps_total = steps_total
+    job.errors_found = errors_found
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=['steps_done', 'steps_total', 'errors_found', 'heartbeat_at'])
+
+
+@handler(VALIDATION)
+def run_validation(job):
+    report_month = job.params['report_month']
+    if not Month.objects.filter(report_month=report_month).exists():
+        raise ValueError(f"Month {report_month} does not exist.")
+
+    # The version is picked when the job runs, not when it is queued, so two
+    # queued runs for the same month still get consecutive versions.
+    version = next_version(report_month)
+    validator = DataValidator(job.created_by, version, report_month, engine=DataValidator.ENGINE_SET,
+                              incremental=job.params.get('incremental', False),
+                              workers=settings.VALIDATION_WORKERS,
+                              progress=lambda done, total, errors: record_progress(job, done, total, errors))
+    run = validator.perform_validation()
+    return {'report_month': report_month, 'version': version, 'errors_found': run.errors_found}
+
+
+@handler(QUARTER_EXPORT)
+def run_quarter_export(job):
+    quarter = Quarter.objects.get(pk=job.params['quarter_id'])
+    # GeneratedFile rows are only saved once their file is complete, so the
+    # download list never links to a half-written file.
+    generated_file = save_quarter(quarter, job.params['name'], job.created_by,
+                                  compress=job.params.get('compress', False),
+                                  progress=lambda done, total: record_progress(job, done, total))
+    return {'generated_file': generated_file.pk, 'name': generated_file.name,
+            'record_count': generated_file.record_count, 'size': generated_file.size}
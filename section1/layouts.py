@@ -0,0 +1,116 @@
+from .models import Family, Adult, Child
+
+# Fixed-width layouts of the T1/T2/T3 transmission records. The exporter
+# (export.write_quarter) writes records with them and ingest.TransmissionLoader
+# reads them back, so both always agree on field order and widths.
+
+# Bookkeeping columns and relations; everything else is part of the record.
+EXCLUDED_FIELDS = ['family', 'id', 'month', 'created_at', 'updated_at', 'created_by', 'updated_by']
+
+
+class RecordLayout:
+    """One record type: the type code, its key fields, then one or more model records.
+
+    Every value is left-aligned and space-padded to its field's max_length, so
+    decoding is a fixed slice per field followed by rstrip(). Encoding is one
+    precompiled %-format per number of records on the line, applied to the
+    values in ``columns`` order (as values_list() returns them).
+    """
+
+    def __init__(self, record_type, model, keys, occurrences=1):
+        self.record_type = record_type
+        self.model = model
+        self.keys = keys
+        self.occurrences = occurrences
+        self.fields = [(field.attname, field.max_length) for field in model._meta.get_fields()
+                       if field.concrete and not field.is_relation and field.name not in EXCLUDED_FIELDS]
+
+        offset = len(record_type)
+        self.key_slices = []
+        for name, width in keys:
+            self.key_slices.append((name, offset, offset + width))
+            offset += width
+        self.start = offset
+        self.field_slices = []
+        position = 0
+        for name, width in self.fields:
+            self.field_slices.append((name, position, position + width))
+            position += width
+        self.record_width = position
+        self.width = self.start + self.record_width * occurrences
+        self.columns = [name for name, _ in self.fields]
+
+        key_format = ''.join(f'%-{width}s' for _, width in keys)
+        record_format = ''.join(f'%-{width}s' for _, width in self.fields)
+        self.formats = {count: record_type + key_format + record_format * count
+                        for count in range(1, occurrences + 1)}
+        self.widths = {count: self.start + self.record_width * count for count in self.formats}
+
+    def encode(self, keys, instances):
+        return self.encode_values(keys, [[getattr(instance, name) for name in self.columns]
+                                         for instance in instances])
+
+    def encode_values(self, keys, rows):
+        """Encode key values and one sequence of ``columns`` values per record."""
+        values = list(keys)
+        for row in rows:
+            values.extend(row)
+        line = self.formats[len(rows)] % tuple(values)
+        if len(line) != self.widths[len(rows)]:
+            # Padding never shortens a value, so a longer line has a value wider than its field.
+            self.check_widths(keys, rows)
+        return line
+
+    def check_widths(self, keys, rows):
+        for (name, width), value in zip(self.keys, keys):
+            if len(str(value)) > width:
+                raise ValueError(f"{self.record_type} {name} '{value}' is longer than {width} characters.")
+        for row in rows:
+            for (name, width), value in zip(self.fields, row):
+                if len(str(value)) > width:
+                    raise ValueError(f"{self.record_type} {name} '{value}' for {' '.join(map(str, keys))} "
+                                     f"is longer than {width} characters.")
+
+    def decode(self, line):
+        """Return the key values and one dict of field values per record present on the line.
+
+        A line must be exactly as wide as the encoder makes it for some number
+        of records; anything else is a damaged or foreign line.
+        """
+        if len(line) not in self.widths.values():
+            widths = ' or '.join(str(width) for width in sorted(self.widths.values()))
+            raise ValueError(f"{self.record_type} line is {len(line)} characters long; expected {widths}.")
+        keys = {name: line[start:end].rstrip() for name, start, end in self.key_slices}
+        records = []
+        for occurrence in range(self.occurrences):
+            offset = self.start + occurrence * self.record_width
+            chunk = line[offset:offset + self.record_width]
+            if occurrence and not chunk.strip():
+                # T3 lines carry a second child only when the family has one.
+                break
+            records.append({name: chunk[start:end].rstrip() for name, start, end in self.field_slices})
+        return keys, records
+
+
+T1 = RecordLayout('T1', Family, [('report_month', 6)])
+T2 = RecordLayout('T2', Adult, [('report_month', 6), ('case_number', 11)])
+T3 = RecordLayout('T3', Child, [('report_month', 6), ('case_number', 11)], occurrences=2)
+
+LAYOUTS = {layout.record_type: layout for layout in (T1, T2, T3)}
+
+# The lines export.write_quarter() writes around the records.
+HEADER = 'Header:'
+TRAILER = 'Trailer:'
+
+
+def decode_line(line):
+    """(layout, keys, records) for a record line, None for a Header or Trailer line.
+
+    Any other line raises ValueError, so nothing in a file is dropped unnoticed.
+    """
+    if line.startswith((HEADER, TRAILER)):
+        return None
+    layout = LAYOUTS.get(line[:2])
+    if layout is None:
+        raise ValueError(f"Not a T1, T2 or T3 record, header or trailer: {line[:20]!r}.")
+    return (layout, *layout.decode(line))
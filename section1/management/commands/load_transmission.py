@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from section1.ingest import TransmissionLoader, parse_transmission_parallel
+from section1.models import Family, Adult, Child
+
+
+class Command(BaseCommand):
+    help = "Load a fixed-width T1/T2/T3 transmission file (as Process Quarter writes it) into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Transmission file to load.")
+        parser.add_argument('--user', required=True, help="Username recorded as the creator of the loaded records.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Processes decoding the file in parallel; records are still written in file order.")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named '{options['user']}'.")
+
+        loader = TransmissionLoader(user, batch_size=options['batch_size'])
+        try:
+            if options['workers'] > 1:
+                counts = loader.load_parsed(parse_transmission_parallel(options['path'], options['workers']))
+            else:
+                with open(options['path'], encoding='utf-8') as lines:
+                    counts = loader.load(lines)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        self.stdout.write(f"Loaded {counts[Family]} families, {counts[Adult]} adults and {counts[Child]} children.")
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from section1.jobs import claim_next, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (validation runs and the like) until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Seconds to wait between polls when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+            self.stdout.write(f"Running {job}")
+            job = run_job(job)
+            self.stdout.write(f"Finished {job}")
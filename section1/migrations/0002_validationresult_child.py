@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='validationresult',
+            name='child',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='validation_results', to='section1.child'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0002_validationresult_child'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='validationresult',
+            index=models.Index(fields=['report_month', 'version'], name='valresult_month_version_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0003_validationresult_month_version_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValidationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_month', models.CharField(max_length=6)),
+                ('version', models.IntegerField()),
+                ('engine', models.CharField(max_length=10)),
+                ('incremental', models.BooleanField(default=False)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='validation_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('report_month', 'version')},
+            },
+        ),
+    ]
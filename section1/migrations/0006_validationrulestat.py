@@ -0,0 +1,42 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0005_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='validationrun',
+            name='errors_found',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='validationrun',
+            name='queries',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='validationrun',
+            name='seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ValidationRuleStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_type', models.CharField(max_length=10)),
+                ('edit_number', models.CharField(blank=True, max_length=6)),
+                ('seconds', models.FloatField(blank=True, null=True)),
+                ('rows_scanned', models.IntegerField(default=0)),
+                ('errors_found', models.IntegerField(default=0)),
+                ('queries', models.IntegerField(default=0)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rule_stats', to='section1.validationrun')),
+            ],
+        ),
+    ]
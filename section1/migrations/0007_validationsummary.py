@@ -0,0 +1,47 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def summarize_existing_results(apps, schema_editor):
+    # Runs from before this table existed have no ValidationRun; they are
+    # summarized straight from their results and keep a null run.
+    ValidationResult = apps.get_model('section1', 'ValidationResult')
+    ValidationRun = apps.get_model('section1', 'ValidationRun')
+    ValidationSummary = apps.get_model('section1', 'ValidationSummary')
+    runs = {(run.report_month, run.version): run for run in ValidationRun.objects.all()}
+    counts = (ValidationResult.objects.values('report_month', 'version', 'edit_type', 'edit_number')
+                                      .annotate(count=Count('id'), validated_at=Max('updated_at'))
+                                      .order_by())
+    ValidationSummary.objects.bulk_create(
+        [ValidationSummary(run=runs.get((row['report_month'], row['version'])), **row) for row in counts],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0006_validationrulestat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValidationSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_month', models.CharField(max_length=6)),
+                ('version', models.IntegerField()),
+                ('edit_type', models.CharField(max_length=10)),
+                ('edit_number', models.CharField(max_length=6)),
+                ('count', models.IntegerField()),
+                ('validated_at', models.DateTimeField()),
+                ('run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='section1.validationrun')),
+            ],
+            options={
+                'unique_together': {('report_month', 'version', 'edit_type', 'edit_number')},
+            },
+        ),
+        migrations.RunPython(summarize_existing_results, migrations.RunPython.noop),
+    ]
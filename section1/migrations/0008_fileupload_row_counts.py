@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0007_validationsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='rows_loaded',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='rows_rejected',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0008_fileupload_row_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='rows_deleted',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='rows_updated',
+            field=models.IntegerField(default=0),
+        ),
+    ]
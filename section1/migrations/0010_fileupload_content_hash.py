@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0009_fileupload_upsert_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.0.2 on 2026-10-18 12:05
+
+import json
+import zlib
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def pack_existing_errors(apps, schema_editor):
+    # Error rows so far hold {'line', 'row', 'errors'} as JSON text; they move
+    # to the line column and compressed data, and their uploads get summaries.
+    ImportError = apps.get_model('section1', 'ImportError')
+    ImportErrorSummary = apps.get_model('section1', 'ImportErrorSummary')
+    counts = Counter()
+    for error in ImportError.objects.iterator():
+        try:
+            entry = json.loads(error.error)
+        except ValueError:
+            entry = {'row': {}, 'errors': {'__all__': [{'message': error.error, 'code': ''}]}}
+        error.line = entry.get('line')
+        error.data = zlib.compress(json.dumps({'row': entry.get('row', {}), 'errors': entry.get('errors', {})},
+                                              separators=(',', ':')).encode())
+        error.save(update_fields=['line', 'data'])
+        for field, messages in entry.get('errors', {}).items():
+            for message in messages:
+                counts[(error.upload_id, error.model_type, field, message.get('code', ''))] += 1
+    ImportErrorSummary.objects.bulk_create(
+        [ImportErrorSummary(upload_id=upload_id, model_type=model_type, field=field, code=code, count=count)
+         for (upload_id, model_type, field, code), count in counts.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0010_fileupload_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportErrorSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_type', models.CharField(max_length=10)),
+                ('field', models.CharField(max_length=100)),
+                ('code', models.CharField(blank=True, max_length=50)),
+                ('count', models.IntegerField()),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='error_summaries', to='section1.fileupload')),
+            ],
+            options={
+                'unique_together': {('upload', 'model_type', 'field', 'code')},
+            },
+        ),
+        migrations.AddField(
+            model_name='importerror',
+            name='line',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='importerror',
+            name='data',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+        migrations.RunPython(pack_existing_errors, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='importerror',
+            name='error',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0011_compact_import_errors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('record_count', models.IntegerField()),
+                ('file', models.FileField(upload_to='export_segments/')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('month', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_segments', to='section1.month')),
+            ],
+            options={
+                'unique_together': {('month', 'fingerprint')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0012_exportsegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedfile',
+            name='record_count',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='generatedfile',
+            name='size',
+            field=models.BigIntegerField(null=True),
+        ),
+    ]
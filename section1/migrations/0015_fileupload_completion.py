@@ -0,0 +1,41 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+def mark_existing_complete(apps, schema_editor):
+    # Earlier uploads kept no record of failing part-way; take them as complete.
+    # With no data fingerprint they are never used to skip a re-upload.
+    FileUpload = apps.get_model('section1', 'FileUpload')
+    FileUpload.objects.update(completed_at=models.F('uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0014_backgroundjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileupload',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='data_fingerprint',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='delete_missing',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='fileupload',
+            name='upsert',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_existing_complete, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:17
+
+import section1.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0015_fileupload_completion'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='adult',
+            managers=[
+                ('objects', section1.models.StampedManager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='child',
+            managers=[
+                ('objects', section1.models.StampedManager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='family',
+            managers=[
+                ('objects', section1.models.StampedManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('section1', '0016_stamped_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='validationrun',
+            name='catalog_version',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -1,8 +1,12 @@
+import json
+import zlib
+
 from django.conf import settings
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 from datetime import datetime
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
@@ -29,6 +33,24 @@ class Month(models.Model):
     class Meta:
         unique_together = ('quarter', 'report_month')
 
+class StampedQuerySet(models.QuerySet):
+    """A QuerySet whose update() stamps updated_at the way save() does.
+
+    Export segments and upload dedupe tell whether a month's records changed
+    from their row counts and latest updated_at (see fingerprints.py), so a
+    bulk update() or bulk_update() has to move updated_at as well.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+
+class StampedManager(models.Manager.from_queryset(StampedQuerySet)):
+    # Data migrations get it too, so RunPython edits are stamped.
+    use_in_migrations = True
+
+
 class Family(models.Model):
     month = models.ForeignKey(Month, on_delete=models.CASCADE)
     case_number = models.CharField(max_length=11)
@@ -108,14 +130,13 @@ class Family(models.Model):
                                    null=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StampedManager()
+
     class Meta:
         unique_together = ('month', 'case_number')
 
-    def get_absolute_url(self):
-        return reverse('family-detail', kwargs={'pk':self.pk})
-
-    def save(self, *args, **kwargs):
-        fields_to_check = ['case_number', 'county_fips_code', 'stratum', 'zip_code', 'funding_stream', \
+    # Numeric fields save() left-pads with zeros to their max_length; bulk ingest applies the same rule.
+    ZERO_PADDED_FIELDS = ['case_number', 'county_fips_code', 'stratum', 'zip_code', 'funding_stream', \
                 'disposition', 'new_applicant', 'num_family_members', 'family_type', \
                 'receives_subsidized_housing', 'receives_medical_assistance', 'snap_amount', \
                 'subsid_child_care_amount', 'child_support_amount', 'family_cash_resources',\
@@ -126,8 +147,12 @@ class Family(models.Model):
                 'item26b_recoupment', 'item26c1_other_tot_red_amount', 'item26c2_family_cap',\
                 'item26c3_red_len_assist', 'item26c4_other_non_sanction', 'fam_exempt_fed_time_limits'
                 ]
-        
-        for field_name in fields_to_check:
+
+    def get_absolute_url(self):
+        return reverse('family-detail', kwargs={'pk':self.pk})
+
+    def save(self, *args, **kwargs):
+        for field_name in self.ZERO_PADDED_FIELDS:
             field_value = getattr(self, field_name)
             field = self._meta.get_field(field_name)  # Get the field object
             max_length = field.max_length  # Read the max_length of the field
@@ -338,6 +363,8 @@ class Adult(models.Model):
                                    null=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StampedManager()
+
     class Meta:
         unique_together = ('family', 'ssn')
 
@@ -431,6 +458,8 @@ class Child(models.Model):
                                    null=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StampedManager()
+
     class Meta:
         unique_together = ('family', 'ssn')
 
@@ -467,12 +496,75 @@ class ValidationResult(models.Model):
 
     adult = models.ForeignKey(Adult, on_delete=models.CASCADE, null=True, blank=True, related_name='validation_results')
     family = models.ForeignKey(Family, on_delete=models.CASCADE, null=True, blank=True, related_name='validation_results')
+    child = models.ForeignKey(Child, on_delete=models.CASCADE, null=True, blank=True, related_name='validation_results')
+
+    class Meta:
+        # Runs and the dashboard always look results up by month and version.
+        indexes = [
+            models.Index(fields=['report_month', 'version'], name='valresult_month_version_idx'),
+        ]
 
     '''
     class Meta:
         unique_together = ('report_month', 'version', 'case_number', 'edit_number', )
     '''
     
+class ValidationRun(models.Model):
+    report_month = models.CharField(max_length=6)
+    version = models.IntegerField()
+    engine = models.CharField(max_length=10)
+    incremental = models.BooleanField(default=False)
+    # edits.catalog_version() of the catalog the run checked; incremental runs
+    # only carry results forward from a run with the same catalog.
+    catalog_version = models.CharField(max_length=64, blank=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    seconds = models.FloatField(null=True, blank=True)
+    queries = models.IntegerField(default=0)
+    errors_found = models.IntegerField(default=0)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, 
+                                   on_delete=models.CASCADE,
+                                   related_name='validation_runs',
+                                   null=False)
+
+    class Meta:
+        unique_together = ('report_month', 'version')
+
+    def __str__(self):
+        return f"Validation run #{self.version} for {self.report_month}"
+
+class ValidationRuleStat(models.Model):
+    # One row per edit. The 'set' engine checks a whole table in one scan, so it
+    # also stores a row per table with a blank edit_number that carries the scan's
+    # time and queries; its per-edit rows only count errors.
+    run = models.ForeignKey(ValidationRun, on_delete=models.CASCADE, related_name='rule_stats')
+    record_type = models.CharField(max_length=10)
+    edit_number = models.CharField(max_length=6, blank=True)
+    seconds = models.FloatField(null=True, blank=True)
+    rows_scanned = models.IntegerField(default=0)
+    errors_found = models.IntegerField(default=0)
+    queries = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.edit_number or self.record_type + ' scan'} in {self.run}"
+
+class ValidationSummary(models.Model):
+    # Result counts per edit for one run, written when the run finishes, so the
+    # dashboard never has to count ValidationResult rows.
+    run = models.ForeignKey(ValidationRun, on_delete=models.CASCADE, null=True, blank=True, related_name='summaries')
+    report_month = models.CharField(max_length=6)
+    version = models.IntegerField()
+    edit_type = models.CharField(max_length=10)
+    edit_number = models.CharField(max_length=6)
+    count = models.IntegerField()
+    validated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('report_month', 'version', 'edit_type', 'edit_number')
+
+    def __str__(self):
+        return f"{self.edit_number} x{self.count} in run #{self.version} for {self.report_month}"
+
 class FileUpload(models.Model):
     month = models.ForeignKey(Month, on_delete=models.CASCADE)
     MODEL_CHOICES = [
@@ -487,6 +579,19 @@ class FileUpload(models.Model):
                                    null=False)
     uploaded_at = models.DateTimeField(auto_now=True)
     file = models.FileField(upload_to='uploads/%Y/%m/%d/')
+    rows_loaded = models.IntegerField(default=0)
+    rows_updated = models.IntegerField(default=0)
+    rows_deleted = models.IntegerField(default=0)
+    rows_rejected = models.IntegerField(default=0)
+    # sha256 of the file's bytes; an identical re-upload reuses this upload's blob.
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    upsert = models.BooleanField(default=False)
+    delete_missing = models.BooleanField(default=False)
+    # Set once every row is in, with the month's data fingerprint at that point:
+    # re-loading the same file with the same options while the fingerprint
+    # still matches cannot change anything.
+    completed_at = models.DateTimeField(null=True, blank=True)
+    data_fingerprint = models.CharField(max_length=64, blank=True)
 
     def __str__(self):
         return f"{self.model_type} file for {self.month} uploaded on {self.uploaded_at}"
@@ -500,7 +605,10 @@ class FileUpload(models.Model):
 class ImportError(models.Model):
     upload = models.ForeignKey(FileUpload, on_delete=models.CASCADE)
     model_type = models.CharField(max_length=10)
-    error = models.TextField()
+    # Line of the rejected row in its file; the row and its errors are kept as
+    # zlib-compressed JSON, see pack() and details.
+    line = models.IntegerField(null=True)
+    data = models.BinaryField()
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, 
                                    on_delete=models.CASCADE,
                                    related_name='import_creator',
@@ -512,6 +620,30 @@ class ImportError(models.Model):
                                    null=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @staticmethod
+    def pack(row, errors):
+        return zlib.compress(json.dumps({'row': row, 'errors': errors}, separators=(',', ':')).encode())
+
+    @property
+    def details(self):
+        """{'row': {...}, 'errors': {field: [{'message': ..., 'code': ...}]}} as the row was rejected."""
+        return json.loads(zlib.decompress(self.data))
+
+class ImportErrorSummary(models.Model):
+    """How many rejected rows of an upload had an error on a field, per error code.
+
+    Written with the upload's ImportError rows, so the upload page can show
+    where a file went wrong without decoding every error row.
+    """
+    upload = models.ForeignKey(FileUpload, on_delete=models.CASCADE, related_name='error_summaries')
+    model_type = models.CharField(max_length=10)
+    field = models.CharField(max_length=100)
+    code = models.CharField(max_length=50, blank=True)
+    count = models.IntegerField()
+
+    class Meta:
+        unique_together = ('upload', 'model_type', 'field', 'code')
+
 class GeneratedFile(models.Model):
     quarter = models.ForeignKey(Quarter, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
@@ -521,9 +653,77 @@ class GeneratedFile(models.Model):
                                    related_name='file_creator',
                                    null=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set once the file is fully written; rows from before these fields existed leave them null.
+    record_count = models.IntegerField(null=True)
+    size = models.BigIntegerField(null=True)
 
     @property
     def file_url(self):
         if self.file and hasattr(self.file, 'url'):
             return self.file.url
-        return None
\ No newline at end of file
+        return None
+
+class ExportSegment(models.Model):
+    """A month's encoded T1/T2/T3 records, reused by exports while the month's data is unchanged.
+
+    ``fingerprint`` summarizes the month's rows (counts and latest updated_at
+    per table) and the record layouts; see export.month_fingerprints().
+    """
+    month = models.ForeignKey(Month, on_delete=models.CASCADE, related_name='export_segments')
+    fingerprint = models.CharField(max_length=64)
+    record_count = models.IntegerField()
+    file = models.FileField(upload_to='export_segments/')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('month', 'fingerprint')
+
+class BackgroundJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    job_type = models.CharField(max_length=30)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    steps_done = models.IntegerField(default=0)
+    steps_total = models.IntegerField(default=0)
+    errors_found = models.IntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, 
+                                   on_delete=models.CASCADE,
+                                   related_name='background_jobs',
+                                   null=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Moved on claim and on every progress report; a running job whose heartbeat
+    # is older than JOB_TIMEOUT lost its worker (see jobs.fail_stale_jobs).
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'], name='job_status_created_idx')]
+
+    def __str__(self):
+        return f"{self.job_type} job #{self.pk} ({self.status})"
+
+    @property
+    def error_message(self):
+        # The last line of the traceback names the exception.
+        lines = self.error.strip().splitlines()
+        return lines[-1] if lines else ''
+
+    @property
+    def eta_seconds(self):
+        # Straight-line estimate from the steps finished so far.
+        if self.status != self.RUNNING or not self.started_at or not self.steps_done:
+            return None
+        elapsed = (datetime.now(self.started_at.tzinfo) - self.started_at).total_seconds()
+        return round(elapsed / self.steps_done * (self.steps_total - self.steps_done))
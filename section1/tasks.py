@@ -1,15 +1,136 @@
-from .models import Family, Adult, Child, ValidationResult
-from django.db.models import Q
+import math
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from operator import or_
+
+import django
+from .models import Family, Adult, Child, ValidationResult, ValidationRun, ValidationRuleStat, ValidationSummary
+from .edits import EDITS, FAMILY, ADULT, CHILD, catalog_version, edits_by_record_type
+from .frames import load_frame, build_mask
+from django.db import connection, connections, transaction
+from django.db.models import BooleanField, ExpressionWrapper
+from django.utils import timezone
+
+class ValidationResultBuffer:
+    """Collects ValidationResult rows; flush() writes them with bulk_create in batches."""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.pending = []
+        self.count = 0
+        self.counts = Counter()
+
+    def add(self, result):
+        self.pending.append(result)
+        self.count += 1
+        self.counts[result.edit_type, result.edit_number] += 1
+
+    def extend(self, results):
+        for result in results:
+            self.add(result)
+
+    def flush(self):
+        if self.pending:
+            ValidationResult.objects.bulk_create(self.pending, batch_size=self.batch_size)
+            self.pending = []
+
+class QueryMeter:
+    """Times the enclosed block and counts the queries it sends to the database."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.wrapper = connection.execute_wrapper(self)
+        self.wrapper.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds += time.perf_counter() - self.started
+        self.wrapper.__exit__(*exc_info)
+
+def scan_failures(queryset, edits):
+    # Every edit on the table is evaluated in the same scan: each one becomes a
+    # boolean column and only rows failing at least one edit are read back.
+    # Only the keys are read, so the related Family is never loaded per row.
+    family_key = 'pk' if queryset.model is Family else 'family_id'
+    flags = {f'edit_{index}': ExpressionWrapper(edit.q(), output_field=BooleanField())
+             for index, edit in enumerate(edits)}
+    rows = (queryset.filter(reduce(or_, (edit.q() for edit in edits)))
+                    .annotate(**flags)
+                    .values_list('pk', family_key, *flags))
+
+    failures = [[] for _ in edits]
+    for pk, family_id, *failed in rows:
+        for index, flag in enumerate(failed):
+            if flag:
+                failures[index].append((pk, family_id))
+    return failures
+
+def scan_partition(model, query, edits):
+    """Process pool entry point: rebuild the queryset from its pickled query and scan it."""
+    queryset = model.objects.all()
+    queryset.query = query
+    with QueryMeter() as meter:
+        failures = scan_failures(queryset, edits)
+    return failures, meter.seconds, meter.queries
+
+def next_version(report_month):
+    latest_validation = ValidationResult.objects.filter(report_month=report_month).order_by('-version').first()
+    return (latest_validation.version + 1) if latest_validation else 1
 
 class DataValidator:
-    def __init__(self, user, version, report_month=None):
+    # Edits come from the catalog in edits.py.
+    # 'orm' walks every offending row as a model instance (loading its Family).
+    # 'set' evaluates all edits on a table in one query that reads back only the
+    # keys, so round trips follow the number of tables, not the number of errors.
+    # 'pandas' reads the month's Family/Adult/Child rows once into DataFrames and
+    # evaluates each edit as a vectorized mask over them.
+    # With workers > 1 the 'set' scans are split by record type and case-number
+    # range and run across a process pool.
+    ENGINE_ORM = 'orm'
+    ENGINE_SET = 'set'
+    ENGINE_PANDAS = 'pandas'
+    ENGINES = (ENGINE_ORM, ENGINE_SET, ENGINE_PANDAS)
+
+    # An incremental run only re-checks records whose updated_at is newer than the
+    # start of the month's previous run and carries that run's other results over.
+    # A previous run made with a different edit catalog is not used: the run is a full one.
+
+    def __init__(self, user, version, report_month=None, engine=ENGINE_ORM, batch_size=1000, incremental=False,
+                 progress=None, workers=1):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown validation engine '{engine}'.")
+        if workers > 1 and engine != self.ENGINE_SET:
+            raise ValueError("Parallel validation is only available with the 'set' engine.")
+        if incremental and report_month is None:
+            raise ValueError("Incremental validation needs a report month.")
         self.user = user
         self.report_month=report_month
         self.version=version
-        print(self.version)
+        self.engine = engine
+        self.batch_size = batch_size
+        self.incremental = incremental
+        self.workers = workers
+        self.previous_run = None
+        self.results = ValidationResultBuffer(batch_size)
+        self.frames = {}
+        # Called as progress(rules_done, rules_total, errors_found) while rules run.
+        self.progress = progress
+        self.stats = []
+        self.row_counts = {}
+        self.meter = QueryMeter()
     
-    def create_validation_error(self, edit_number, item_number, description, edit_values, edit_type, family=None, adult=None):
-        ValidationResult.objects.create(
+    def create_validation_error(self, edit_number, item_number, description, edit_values, edit_type, family=None, adult=None, child=None):
+        self.results.add(ValidationResult(
                 report_month=self.report_month,
                 version=self.version,
                 edit_type = edit_type,
@@ -21,443 +142,239 @@ class DataValidator:
                 updated_by=self.user,
                 family=family,
                 adult=adult,
+                child=child,
+            ))
+
+    def families(self):
+        # Every edit is scoped to the month being validated; without a month the
+        # whole history is checked, as before.
+        if self.report_month is None:
+            return Family.objects.all()
+        return Family.objects.filter(month__report_month=self.report_month)
+
+    def adults(self):
+        if self.report_month is None:
+            return Adult.objects.all()
+        return Adult.objects.filter(family__month__report_month=self.report_month)
+
+    def children(self):
+        if self.report_month is None:
+            return Child.objects.all()
+        return Child.objects.filter(family__month__report_month=self.report_month)
+
+    def records(self, record_type):
+        records = {FAMILY: self.families, ADULT: self.adults, CHILD: self.children}[record_type]()
+        if self.previous_run is not None:
+            records = records.filter(updated_at__gte=self.previous_run.started_at)
+        return records
+
+    def get_previous_run(self, catalog):
+        previous = (ValidationRun.objects.filter(report_month=self.report_month, version__lt=self.version,
+                                                 finished_at__isnull=False)
+                                         .order_by('-version').first())
+        if previous is None or previous.catalog_version != catalog:
+            return None
+        return previous
+
+    def carry_forward_results(self):
+        """Copy the previous run's results for records that have not changed since it started."""
+        since = self.previous_run.started_at
+        unchanged = (ValidationResult.objects.filter(report_month=self.report_month, version=self.previous_run.version)
+                                             .exclude(edit_number='T-000')
+                                             .exclude(adult__isnull=True, child__isnull=True, family__updated_at__gte=since)
+                                             .exclude(adult__updated_at__gte=since)
+                                             .exclude(child__updated_at__gte=since))
+        fields = ['edit_type', 'edit_number', 'item_number', 'description', 'edit_values',
+                  'family_id', 'adult_id', 'child_id']
+        self.results.extend(
+            ValidationResult(report_month=self.report_month, version=self.version,
+                             created_by=self.user, updated_by=self.user, **values)
+            for values in unchanged.values(*fields).iterator()
+        )
+
+    def add_results(self, edit, model, keys):
+        self.results.extend(
+            ValidationResult(
+                report_month=self.report_month,
+                version=self.version,
+                edit_type=edit.edit_type,
+                edit_number=edit.edit_number,
+                item_number=edit.item_number,
+                description=edit.description,
+                edit_values=edit.message,
+                created_by=self.user,
+                updated_by=self.user,
+                family_id=family_id,
+                adult_id=pk if model is Adult else None,
+                child_id=pk if model is Child else None,
             )
+            for pk, family_id in keys
+        )
+
+    def emit(self, edit):
+        """Record one validation error per record failing ``edit``, one row at a time."""
+        for record in self.records(edit.record_type).filter(edit.q()):
+            args = (edit.edit_number, edit.item_number, edit.description, edit.message, edit.edit_type)
+            if isinstance(record, Family):
+                self.create_validation_error(*args, family=record)
+            elif isinstance(record, Adult):
+                self.create_validation_error(*args, family=record.family, adult=record)
+            else:
+                self.create_validation_error(*args, family=record.family, child=record)
+
+    def emit_set(self, record_type, edits):
+        queryset = self.records(record_type)
+        failures = scan_failures(queryset, edits)
+        for edit, keys in zip(edits, failures):
+            self.add_results(edit, queryset.model, keys)
+        return failures
+
+    def case_ranges(self):
+        """Split the month's case numbers into one (low, high) range per worker; None leaves a side open."""
+        case_numbers = list(self.families().order_by('case_number').values_list('case_number', flat=True))
+        size = max(math.ceil(len(case_numbers) / self.workers), 1)
+        bounds = case_numbers[size::size]
+        return list(zip([None] + bounds, bounds + [None]))
+
+    def partitions(self, record_type, ranges):
+        queryset = self.records(record_type)
+        key = 'case_number' if queryset.model is Family else 'family__case_number'
+        for low, high in ranges:
+            partition = queryset
+            if low is not None:
+                partition = partition.filter(**{f'{key}__gte': low})
+            if high is not None:
+                partition = partition.filter(**{f'{key}__lt': high})
+            yield partition
+
+    def run_parallel(self, edits):
+        # Each record type is cut into case-number ranges and every (record type,
+        # range) slice is scanned in its own process. Workers only read; their keys
+        # come back here and are merged, in submission order, into this run's buffer.
+        ranges = self.case_ranges()
+        tasks = [(group, partition)
+                 for record_type, group in edits_by_record_type(edits).items()
+                 for partition in self.partitions(record_type, ranges)]
+        # Forked workers must not share the parent's database connection.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup) as pool:
+            futures = [pool.submit(scan_partition, partition.model, partition.query, group)
+                       for group, partition in tasks]
+            rules_done = 0
+            scan = QueryMeter()
+            errors = {}
+            for index, (future, (group, partition)) in enumerate(zip(futures, tasks)):
+                failures, seconds, queries = future.result()
+                # Worker time is summed, so the scan row shows CPU time, not wall time.
+                scan.seconds += seconds
+                scan.queries += queries
+                self.meter.queries += queries
+                for edit, keys in zip(group, failures):
+                    self.add_results(edit, partition.model, keys)
+                    errors[edit.edit_number] = errors.get(edit.edit_number, 0) + len(keys)
+                last_of_group = index + 1 == len(tasks) or tasks[index + 1][0] is not group
+                if last_of_group:
+                    record_type = group[0].record_type
+                    self.add_stat(record_type, '', sum(errors.values()), scan)
+                    for edit in group:
+                        self.add_stat(record_type, edit.edit_number, errors[edit.edit_number])
+                    scan = QueryMeter()
+                    errors = {}
+                    rules_done += len(group)
+                    self.report_progress(rules_done, len(edits))
+
+    def emit_frame(self, edit):
+        model = self.records(edit.record_type).model
+        if model not in self.frames:
+            self.frames[model] = load_frame(self.records(edit.record_type))
+            self.row_counts[edit.record_type] = len(self.frames[model])
+        frame = self.frames[model]
+
+        matches = frame[build_mask(self.records(edit.record_type).filter(edit.q()), frame)]
+        family_key = 'id' if model is Family else 'family_id'
+        self.add_results(edit, model, zip(matches['id'].tolist(), matches[family_key].tolist()))
     
     def get_next_version(self):
-        latest_validation = ValidationResult.objects.filter(report_month=self.report_month).order_by('-version').first()
-        return (latest_validation.version + 1) if latest_validation else 1
-
-    def perform_validation(self):
-        self.validate_case_numbers()
-        self.validate_dispositions()
-        self.validate_dispositions()
-        self.validate_number_family_members()
-        self.validate_family_type()
-        self.validate_family_affiliation()
-        self.validate_adult_dob()
-        self.validate_adult_ssn()
-        self.validate_race_ethnicity()
-        self.validate_marital_status()
-        self.validate_relationship_to_hoh()
-        self.validate_parent_with_minor()
-        self.validate_education_level()
-        self.validate_citizenship_immigration_status()
-        self.validate_coop_child_support()
-        self.validate_countable_federal_time_limit_months()
-        self.validate_employment_status()
-        self.validate_work_participation_status()
-        self.validate_work_activity_hours()
-        self.closeout_validation()        
-        self.validate_child_family_affiliation        
-        self.validate_child_race_ethnicity()        
-        self.validate_child_relationship_to_hoh()        
-        self.validate_education_level()
-        self.validate_citizenship_immigration_status()
+        return next_version(self.report_month)
+
+    def perform_validation(self, edits=EDITS):
+        # Every rule is evaluated before anything is written, so progress reported
+        # along the way commits on its own while the run's results (buffered and
+        # written in batches) still land in a single transaction.
+        run = ValidationRun(report_month=self.report_month, version=self.version,
+                            engine=self.engine, incremental=self.incremental,
+                            catalog_version=catalog_version(edits), started_at=timezone.now(),
+                            created_by=self.user)
+        with self.meter:
+            if self.incremental:
+                # Without a finished earlier run there is nothing to carry over.
+                self.previous_run = self.get_previous_run(run.catalog_version)
+            if self.previous_run is not None:
+                self.carry_forward_results()
+            self.run_validations(edits)
+            run.errors_found = self.results.count
+            self.closeout_validation()
+        run.seconds = self.meter.seconds
+        run.queries = self.meter.queries
+        with transaction.atomic():
+            run.finished_at = timezone.now()
+            run.save()
+            self.results.flush()
+            for stat in self.stats:
+                stat.run = run
+            ValidationRuleStat.objects.bulk_create(self.stats, batch_size=self.batch_size)
+            ValidationSummary.objects.bulk_create([
+                ValidationSummary(run=run, report_month=self.report_month, version=self.version,
+                                  edit_type=edit_type, edit_number=edit_number, count=count,
+                                  validated_at=run.finished_at)
+                for (edit_type, edit_number), count in self.results.counts.items()
+            ], batch_size=self.batch_size)
+        return run
+
+    def rows_scanned(self, record_type):
+        if record_type not in self.row_counts:
+            self.row_counts[record_type] = self.records(record_type).count()
+        return self.row_counts[record_type]
+
+    def add_stat(self, record_type, edit_number, errors_found, meter=None):
+        # Edits checked inside a shared scan have no time or queries of their own.
+        self.stats.append(ValidationRuleStat(
+            record_type=record_type,
+            edit_number=edit_number,
+            seconds=meter.seconds if meter else None,
+            queries=meter.queries if meter else 0,
+            rows_scanned=self.rows_scanned(record_type),
+            errors_found=errors_found,
+        ))
+
+    def report_progress(self, rules_done, rules_total):
+        if self.progress is not None:
+            self.progress(rules_done, rules_total, self.results.count)
+
+    def run_validations(self, edits):
+        rules_done = 0
+        if self.workers > 1:
+            self.run_parallel(edits)
+        elif self.engine == self.ENGINE_SET:
+            for record_type, group in edits_by_record_type(edits).items():
+                with QueryMeter() as meter:
+                    failures = self.emit_set(record_type, group)
+                self.add_stat(record_type, '', sum(len(keys) for keys in failures), meter)
+                for edit, keys in zip(group, failures):
+                    self.add_stat(record_type, edit.edit_number, len(keys))
+                rules_done += len(group)
+                self.report_progress(rules_done, len(edits))
+        else:
+            emit = self.emit_frame if self.engine == self.ENGINE_PANDAS else self.emit
+            for edit in edits:
+                errors_before = self.results.count
+                with QueryMeter() as meter:
+                    emit(edit)
+                self.add_stat(edit.record_type, edit.edit_number, self.results.count - errors_before, meter)
+                rules_done += 1
+                self.report_progress(rules_done, len(edits))
 
     def closeout_validation(self):
-        closeout_version = ValidationResult.objects.filter(report_month=self.report_month).order_by('-version').first()
-        if closeout_version is not None:
-            if closeout_version.version != self.version:
-                #self.version += 1
-                self.create_validation_error('T-000', '000', 'NO ERRORS','NO ERRORS', 'NO ERRORS')
-
-    def validate_case_numbers(self):
-        missing_cases = Family.objects.filter(case_number__isnull=True, case_number='')
-        for family in missing_cases:
-            self.self.create_validation_error('T1-004', '6', 'CASE NUMBER', 'ITEM 6? MUST NOT BE BLANK', 'FATAL', family=family) 
-
-    def validate_dispositions(self):
-        #ITEM 9 MUST = 1-2 
-        #IF ITEM 9 = 2, THEN ITEMS 1,4-6 MUST NOT BE BLANK 
-        invalid_dispositions = Family.objects.exclude(disposition__in=[1,2])
-        for family in invalid_dispositions:
-            self.create_validation_error('T1-008', '9', 'DISPOSITION', 'ITEM 9 MUST = 1-2', 'FATAL', family=family)
-
-    def validate_number_family_members(self):
-        invalid_numbers = Family.objects.filter(num_family_members=0)
-        for family in invalid_numbers:
-            self.create_validation_error('T1-010', '11', 'NUMBER OF FAMILY MEMBERS', 'ITEM 11 MUST > 0', 'FATAL', family=family)
-
-    def validate_family_type(self):
-        exclude_types = [1,2,3]
-        invalid_family_types = Family.objects.exclude(family_type__in=exclude_types)
-        for family in invalid_family_types:
-            self.create_validation_error('T1-011', '12', 'FAMILY TYPE FOR WORK PARTICIPATION', 'ITEM 12 MUST = 1-3', 'FATAL', family=family)
-
-    def validate_family_affiliation(self):
-        exclude_list = [1,2,3,4,5]
-        invalid_affiliations = Adult.objects.exclude(family_affiliation__in=exclude_list)
-        for adult in invalid_affiliations:
-            self.create_validation_error('T1-014', '30', 'FAMILY AFFILIATION -ADULT', 'ITEM 30 MUST = 1-5 ', 'FATAL', family=adult.family, adult=adult)
-
-    def validate_adult_dob(self):
-        #IF ITEM 32 = 99999999 ITEM 30 MUST = 2-5
-        #IF ITEM 32 MUST NOT BE BLANK OR ZEROES
-        exclude_list = [2,3,4,5]
-        adults = Adult.objects.filter(date_of_birth = '', date_of_birth__isnull=True)
-        for adult in adults:
-            self.create_validation_error('T1-015', '32', 'DATE OF BIRTH -ADULT', 'ITEM 32 MUST NOT BE BLANK OR ZEROES', 'FATAL', family=adult.family, adult=adult)
-
-        adults = Adult.objects.filter(date_of_birth='99999999').exclude(family_affiliation__in=exclude_list)
-        for adult in adults:
-            self.create_validation_error('T1-016', '32', 'DATE OF BIRTH -ADULT', 'IF ITEM 32 = 99999999 ITEM 30 MUST = 2-5', 'FATAL',family=adult.family, adult=adult)
-
-    def validate_adult_ssn(self):
-        invalid_ssns = Adult.objects.filter(Q(ssn='') | Q(ssn__isnull=True))
-        invalid_ssn_affiliations= Adult.objects.filter(ssn='999999999', family_affiliation=1)
-        for invalid_ssn in invalid_ssns:
-            self.create_validation_error('T1-017', '33', 'SSN -ADULT', 'ITEM 33 MUST NOT BE BLANK', 'FATAL', family=invalid_ssn.family, adult=invalid_ssn)
-
-        for invalid_ssn_affiliation in invalid_ssn_affiliations:
-            self.create_validation_error('T1-018', '33', 'SSN -ADULT', 'IF ITEM 33 = 999999999 ITEM 30 MUST = 2-5', 'FATAL', family=invalid_ssn_affiliation.family, adult=invalid_ssn_affiliation) 
-
-    def validate_race_ethnicity(self):
-        #IF ITEM 34A = BLANK ITEM 30 MUST = 5
-        #IF ITEM 30= 1-4, ITEM 34A MUST = 1 OR 2
-        exclude_list = [1,2]
-        exclude_affiliation_list = [1,2,3,4]
-        invalid_race_affiliations = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34a_hispanic_latino__in = exclude_list)
-        blank_race_affilitations = Adult.objects.filter(item34a_hispanic_latino='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:
-            self.create_validation_error('T1-019', '34', 'RACE/ETHNICITY', \
-                        'IF ITEM 34A = BLANK ITEM 30 MUST = 5', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-
-        for invalid_race_affiliation in invalid_race_affiliations:
-            self.create_validation_error('T1-020', '34', 'RACE/ETHNICITY', \
-                                    'IF ITEM 30= 1-4, ITEM 34A MUST = 1 OR 2', 'FATAL', family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-        invalid_race_affiliations = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34b_american_indian_alaska_native__in = exclude_list)
-        blank_race_affilitations = Adult.objects.filter(item34b_american_indian_alaska_native='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:
-            self.create_validation_error('T1-021', '34', 'RACE/ETHNICITY', 'IF ITEM 34B = BLANK ITEM 30 MUST = 5', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-        for invalid_race_affiliation in invalid_race_affiliations:
-                        self.create_validation_error('T1-022', '34', 'RACE/ETHNICITY', 'IF ITEM 30= 1-4, ITEM 34B MUST = 1 OR 2', 'FATAL',family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-    
-        invalid_race_affiliations = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34c_asian__in = exclude_list)
-        blank_race_affilitations = Adult.objects.filter(item34c_asian='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:
-            self.create_validation_error('T1-023', '34', 'RACE/ETHNICITY','IF ITEM 34C = BLANK ITEM 30 MUST = 5', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-        for invalid_race_affiliation in invalid_race_affiliations:
-            self.create_validation_error('T1-024', '34', 'RACE/ETHNICITY', 'IF ITEM 30= 1-4, ITEM 34C MUST = 1 OR 2', 'FATAL', family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-        invalid_race_affiliations = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34d_black__in = exclude_list)
-        blank_race_affilitations = Adult.objects.filter(item34d_black='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:
-                        self.create_validation_error('T1-024', '34', 'RACE/ETHNICITY','IF ITEM 34D = BLANK ITEM 30 MUST = 5', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-        for invalid_race_affiliation in invalid_race_affiliations:        
-            self.create_validation_error('T1-025', '34', 'RACE/ETHNICITY','IF ITEM 34D = BLANK ITEM 30 MUST = 5', 'FATAL',family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-        invalid_race_affiliations = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34e_native_pacific_islander__in = exclude_list)
-        blank_race_affilitations = Adult.objects.filter(item34e_native_pacific_islander='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:        
-            self.create_validation_error('T1-025', '34', 'RACE/ETHNICITY', 'IF ITEM 34E = BLANK ITEM 30 MUST = 5', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-
-        for invalid_race_affiliation in invalid_race_affiliations:
-            self.create_validation_error('T1-026', '34', 'RACE/ETHNICITY', 'IF ITEM 30= 1-4, ITEM 34E MUST = 1 OR 2', 'FATAL', family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-        invalid_race_affiliations = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34f_white__in = exclude_list)
-        blank_race_affilitations = Adult.objects.filter(item34f_white='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:        
-            self.create_validation_error('T1-027', '34', 'RACE/ETHNICITY', 'IF ITEM 34F = BLANK ITEM 30 MUST = 5', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)            
-
-        for invalid_race_affiliation in invalid_race_affiliations:
-            self.create_validation_error('T1-028', '34', 'RACE/ETHNICITY', 'IF ITEM 30= 1-4, ITEM 34F MUST = 1 OR 2', 'FATAL',family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-    def validate_marital_status(self):
-        #IF ITEM 37 = BLANK, ITEM 30 MUST = 5
-        #IF ITEM 30 = 1-4, ITEM 37 MUST = 1-5
-        exclude_list = [1,2,3,4,5]
-        exclude_affiliation_list = [1,2,3,4]
-        invalid_37_affiliations = Adult.objects.filter(marital_status='', family_affiliation__in=exclude_affiliation_list)
-        invalid_37s = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(marital_status__in=exclude_list)
-        for invalid_37_affiliation in invalid_37_affiliations:
-            self.create_validation_error('T1-031', '37', 'MARITAL STATUS','IF ITEM 37 = BLANK, ITEM 30 MUST = 5', 'FATAL', family=invalid_37_affiliation.family,adult=invalid_37_affiliation)
-
-        for invalid_37 in invalid_37s:
-            self.create_validation_error('T1-032', '37', 'MARITAL STATUS', 'IF ITEM 30 = 1-4, ITEM 37 MUST = 1-5', 'FATAL', family=invalid_37.family, adult=invalid_37)
-
-    def validate_relationship_to_hoh(self):
-        exclude_list = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10']
-        invalid_hoh_relations = Adult.objects.exclude(relationship_to_hoh__in=exclude_list)
-
-        for invalid_hoh_relation in invalid_hoh_relations:
-            self.create_validation_error('T1-033', '38', 'RELATIONSHIP TO HEAD OF HOUSEHOLD', 'ITEM 38 MUST = 01-10', 'FATAL', family=invalid_hoh_relation.family, adult=invalid_hoh_relation) 
-
-    def validate_parent_with_minor(self):
-        #IF ITEM 30 = 1,2,4 , ITEM 39 MUST = 1-3
-        #IF ITEM 39 = BLANK, ITEM 30 MUST = 3 OR 5
-        exclude_list = [1,2,3]
-        exclude_affiliation_list1 = [1,2,4]
-        exclude_affiliation_list2 = [3,5]
-        invalid_39_affiliations = Adult.objects.filter(parent_with_minor_child='', parent_with_minor_child__isnull=True, ).exclude(family_affiliation__in=exclude_affiliation_list2)
-        invalid_39s = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list1).exclude(parent_with_minor_child__in=exclude_list)
-        for invalid_39_affiliation in invalid_39_affiliations:
-            self.create_validation_error('T1-034', '39', 'PARENT WITH MINOR CHILD IN THE FAMILY','IF ITEM 39 = BLANK, ITEM 30 MUST = 3 OR 5', 'FATAL', family=invalid_39_affiliation.family, adult=invalid_39_affiliation)
-            
-        for invalid_39 in invalid_39s:
-            self.create_validation_error('T1-035', '39', 'PARENT WITH MINOR CHILD IN THE FAMILY', 'IF ITEM 30 = 1,2,4 , ITEM 39 MUST = 1-3', 'FATAL', family=invalid_39.family, adult=invalid_39)
-
-    def validate_education_level(self):
-        #IF ITEM 30 = 2-5 ITEM 41 MUST =? 01-16,98,99
-        #IF ITEM 30 = 1, ITEM 41 MUST = 01-16,98
-        #IF ITEM 41 = BLANK, ITEM 30 MUST = 5
-        exclude_list1 = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12', '13', '14', '15', '16', '98', '99']
-        exclude_list2 = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12', '13', '14', '15', '16', '98', '99']
-        exclude_affiliation_list1 = [2,3,4,5]
-        exclude_affiliation_list2 = [1]
-        exclude_affiliation_list3 = [1,2,3,4]
-        excluded_affiliation_adult_list = Adult.objects.exclude(family_affiliation__in=exclude_affiliation_list1)
-        invalid_41_affiliations = excluded_affiliation_adult_list.exclude(educational_level__in=exclude_list1)
-        invalid_41s = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list2).exclude(educational_level__in=exclude_list2)
-        invalid_41bs = Adult.objects.filter(educational_level=5).exclude(family_affiliation__in=exclude_affiliation_list3)
-        for invalid_41_affiliation in invalid_41_affiliations:
-            self.create_validation_error('T1-036', '41', 'EDUCATION LEVEL','IF ITEM 30 = 2-5 ITEM 41 MUST =? 01-16,98,99', 'FATAL', family=invalid_41_affiliation.family,adult=invalid_41_affiliation)
-            
-        for invalid_41 in invalid_41s:
-            self.create_validation_error('T1-037', '41', 'EDUCATION LEVEL', 'IF ITEM 30 = 1, ITEM 41 MUST = 01-16,98', 'FATAL',family=invalid_41.family,adult=invalid_41)
-
-        for invalid_41b in invalid_41bs:
-            self.create_validation_error('T1-038', '41', 'EDUCATION LEVEL', 'IF ITEM 41 = BLANK, ITEM 30 MUST = 5', 'FATAL', family=invalid_41b.family, adult=invalid_41b)
-
-    def validate_citizenship_immigration_status(self):
-        #IF ITEM 42 = BLANK, ITEM 30 MUST = 5
-        #IF ITEM 30 = 1-4, ITEM 42 MUST = 1-2,9,
-        exclude_list = [1,2,9]
-        exclude_affiliation_list1 = [1,2,3,4]
-        exclude_affiliation_list2 = [5]
-        excluded_affiliation_adult_list = Adult.objects.exclude(family_affiliation__in=exclude_affiliation_list1)
-        invalid_39_affiliations = excluded_affiliation_adult_list.exclude(citizenship_immigration_status__in=exclude_list)
-        invalid_39s = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list2).exclude(citizenship_immigration_status='')
-        for invalid_39_affiliation in invalid_39_affiliations:
-            self.create_validation_error('T1-040', '42', 'CITIZENSHIP/ALIENAGE','IF ITEM 42 = BLANK, ITEM 30 MUST = 5', 'FATAL', family=invalid_39_affiliation.family,adult=invalid_39_affiliation)
-        
-        for invalid_39 in invalid_39s:
-            self.create_validation_error('T1-041', '42', 'CITIZENSHIP/ALIENAGE', 'IF ITEM 30 = 1-4, ITEM 42 MUST = 1-2,9', 'FATAL', family=invalid_39.family,adult=invalid_39)
-    
-    def validate_coop_child_support(self):
-        #ITEM 43 MUST = 1-2, OR 9
-        #IF ITEM 43 = BLANK, ITEM 30 MUST = 5
-        exclude_list = [1,2,9]
-        exclude_affiliation_list1 = [1,2,3,4]
-        exclude_affiliation_list2 = [5]
-        excluded_affiliation_adult_list = Adult.objects.exclude(family_affiliation__in=exclude_affiliation_list1)
-        invalid_41_affiliations = excluded_affiliation_adult_list.exclude(coop_child_support__in=exclude_list)
-        invalid_41s = Adult.objects.filter(family_affiliation__in=exclude_affiliation_list2).exclude(coop_child_support='')
-
-        for invalid_41_affiliation in invalid_41_affiliations:
-            self.create_validation_error('T1-042', '43', 'COOPERATION WITH CHILD SUPPORT','ITEM 43 MUST = 1-2, OR 9 ', 'FATAL', family=invalid_41_affiliation.family, adult=invalid_41_affiliation)
-
-        for invalid_41 in invalid_41s:
-            self.create_validation_error('T1-043', '43', 'COOPERATION WITH CHILD SUPPORT', 'IF ITEM 43 = BLANK, ITEM 30 MUST = 5', 'FATAL', family=invalid_41.family,adult=invalid_41)
-
-    def validate_countable_federal_time_limit_months(self):
-        #IF ITEM 30 = 1 AND ITEM 38=1 OR 2, THEN ITEM 44 MUST => 0
-        exclude_list=['']
-        invalidate_ftls = Adult.objects.filter(family_affiliation = 1, relationship_to_hoh__in=['01', '02'],countable_federal_time_limit_months__in=exclude_list)
-        for invalidate_ftl in invalidate_ftls:
-            print(invalidate_ftl)
-            self.create_validation_error('T1-045', '44', 'NUMBER OF MONTHS COUNTABLE TOWARDS FEDERAL TIME-LIMIT', \
-                        'IF ITEM 30 = 1 AND ITEM 38=1 OR 2, THEN ITEM 44 MUST => 0', 'FATAL',family=invalidate_ftl.family,adult=invalidate_ftl)
-
-    def validate_employment_status(self):
-        #IF ITEM 30 = 1-4 THEN ITEM 47 MUST = 1-3
-        #IF ITEM 47 = BLANK, ITEM 30 MUST = 5
-        exclude_list = [1,2,3]
-        exclude_affiliation_list1 = [1,2,3,4]
-        exclude_affiliation_list2 = [5]
-        excluded_affiliation_adult_list = Adult.objects.exclude(family_affiliation__in=exclude_affiliation_list1)
-        invalid_47_affiliations = excluded_affiliation_adult_list.exclude(employment_status__in=exclude_list)
-        invalid_47s = Adult.objects.filter(employment_status='').exclude(family_affiliation__in=exclude_affiliation_list2)
-        for invalid_47_affiliation in invalid_47_affiliations:
-            self.create_validation_error('T1-050', '47', 'EMPLOYMENT STATUS', \
-                        'IF ITEM 30 = 1-4 THEN ITEM 47 MUST = 1-3', 'FATAL',family=invalid_47_affiliation.family,adult=invalid_47_affiliation)
-        
-        for invalid_47 in invalid_47s:
-            self.create_validation_error('T1-051', '47', 'EMPLOYMENT STATUS', 'IF ITEM 47 = BLANK, ITEM 30 MUST = 5', 'FATAL', family=invalid_47.family,adult=invalid_47)
-
-    def validate_work_participation_status(self):
-        #IF ITEM 30 = 1 or 2, THEN ITEM 49 MUST = 01-02, 05-19, or 99
-        #IF ITEM 30 = 3, 4, or 5, THEN ITEM 49 MUST = 99, OR BLANK
-        exclude_list1 = ['01', '02','05','06','07','08','09','10', '11','12','13','14','15','16','17','18','19','99']
-        exclude_list2 = ['','99']
-        wps_errors = Adult.objects.filter(family_affiliation__in=[1,2]).exclude(work_participation_status__in=exclude_list1)
-        wps1_errors = Adult.objects.filter(family_affiliation__in=[3,4,5]).exclude(work_participation_status__in=exclude_list2)
-        for wps_error in wps_errors:
-            self.create_validation_error('T1-052', '49', 'WORK PARTICIPATION STATUS', \
-                        'IF ITEM 30 = 1 or 2, THEN ITEM 49 MUST = 01-02, 05-19, or 99', 'FATAL', family=wps_error.family, adult=wps_error)
-        for wps1_error in wps1_errors:
-            self.create_validation_error('T1-053', '49', 'WORK PARTICIPATION STATUS', \
-                        'IF ITEM 30 = 3, 4, or 5, THEN ITEM 49 MUST = 99, OR BLANK', 'FATAL', family=wps1_error.family,adult=wps1_error)
-
-    def validate_work_activity_hours(self):
-        #IF ITEM 30 = 1, THEN ITEM 50 MUST => 0
-        work_activity_hour_errors = Adult.objects.filter(family_affiliation__in=[1], unsubsidized_employment_hours='', unsubsidized_employment_hours__isnull=True)
-        for work_activity_hour_error in work_activity_hour_errors:
-            self.create_validation_error('T1-054', '50', 'UNSUBSIDIZED EMPLOYMENT', \
-                        'IF ITEM 30 = 1, THEN ITEM 50 MUST => 0', 'FATAL', family=work_activity_hour_error.family,adult=work_activity_hour_error)
-        
-        work_activity_hour_errors = Adult.objects.filter(family_affiliation__in=[1], unsubsidized_employment_hours='', unsubsidized_employment_hours__isnull=True)
-        for work_activity_hour_error in work_activity_hour_errors:
-            self.create_validation_error(work_activity_hour_error.family.case_number,'T1-054', '50', 'UNSUBSIDIZED EMPLOYMENT', \
-                        'IF ITEM 30 = 1, THEN ITEM 50 MUST => 0', 'FATAL',family=work_activity_hour_error.family,adult=work_activity_hour_error)
-        
-        work_activity_hour_errors = Adult.objects.filter(family_affiliation__in=[1], subsidized_private_employment_hours='', subsidized_private_employment_hours__isnull=True)
-        for work_activity_hour_error in work_activity_hour_errors:
-            self.create_validation_error('T1-055', '51', 'SUBSIDIZED PVT EMPLOYMENT', \
-                        'IF ITEM 30 = 1, THEN ITEM 51 MUST => 0', 'FATAL', family=work_activity_hour_error.family,adult=work_activity_hour_error)
-        
-        work_activity_hour_errors = Adult.objects.filter(family_affiliation__in=[1], subsidized_public_employment_hours='', subsidized_public_employment_hours__isnull=True)
-        for work_activity_hour_error in work_activity_hour_errors:
-            self.create_validation_error('T1-056', '52', 'UNSUBSIDIZED EMPLOYMENT', \
-                        'IF ITEM 30 = 1, THEN ITEM 52 MUST => 0', 'FATAL',family=work_activity_hour_error.family,adult=work_activity_hour_error)
-        
-        work_activity_hour_errors = Adult.objects.filter(family_affiliation__in=[1], on_job_training_hours='', on_job_training_hours__isnull=True)
-        for work_activity_hour_error in work_activity_hour_errors:
-            self.create_validation_error('T1-058', '54', 'UNSUBSIDIZED EMPLOYMENT', \
-                        'IF ITEM 30 = 1, THEN ITEM 54 MUST => 0', 'FATAL', family=work_activity_hour_error.family,adult=work_activity_hour_error)
-        
-            work_activity_hour_errors = Adult.objects.filter(family_affiliation__in=[1], unsubsidized_employment_hours='', unsubsidized_employment_hours__isnull=True)
-        for work_activity_hour_error in work_activity_hour_errors:
-            self.create_validation_error('T1-054', '50', 'UNSUBSIDIZED EMPLOYMENT', \
-                        'IF ITEM 30 = 1, THEN ITEM 50 MUST => 0', 'FATAL',family=work_activity_hour_error.family,adult=work_activity_hour_error)
-    
-    def validate_child_family_affiliation(self):
-        #ITEM 67 MUST = 1-5
-        exclude_list = [1,2,3,4,5]
-        invalid_affiliations = Child.objects.exclude(family_affiliation__in=exclude_list)
-        for child in invalid_affiliations:
-            self.create_validation_error('T1-070', '67', 'FAMILY AFFILIATION -CHILD', 'ITEM 67 MUST = 1-5', 'FATAL', family=child.family, adult=child)
-    
-    def validate_child_dob(self):
-        #IF ITEM 68 = 99999999 THEN ITEM 67 MUST = 2-5 
-        #ITEM 68 MUST NOT BE BLANK
-        exclude_list = [2,3,4,5]
-        children = Child.objects.filter(date_of_birth = '', date_of_birth__isnull=True)
-        for child in children:
-            self.create_validation_error('T1-071', '68', 'DATE OF BIRTH -CHILD', 'ITEM 68 MUST NOT BE BLANK OR ZEROES', 'FATAL', family=child.family, adult=child)
-
-        children = Child.objects.filter(date_of_birth='99999999').exclude(family_affiliation__in=exclude_list)
-        for child in children:
-            self.create_validation_error('T1-072', '68', 'DATE OF BIRTH -CHILD', 'IF ITEM 68 = 99999999 ITEM 67 MUST = 2-5', 'FATAL',family=child.family, adult=child)
-
-    def validate_child_ssn(self):
-        #IF ITEM 69 = 999999999 THEN ITEM 67 MUST = 2-5
-        #IF ITEM 69 = BLANK, ITEM 67 MUST = 4
-        invalid_ssns = Adult.objects.filter(ssn='', ssn__isnull=True)
-        invalid_ssn_affiliations= Child.objects.filter(ssn='999999999', family_affiliation=1)
-        for invalid_ssn in invalid_ssns:
-            self.create_validation_error('T1-073', '69', 'SSN -CHILD', 'ITEM 69 MUST NOT BE BLANK', 'FATAL', family=invalid_ssn.family, adult=invalid_ssn)
-
-        for invalid_ssn_affiliation in invalid_ssn_affiliations:
-            self.create_validation_error('T1-074', '69', 'SSN -ADULT', 'IF ITEM 69 = 999999999 ITEM 67 MUST = 2-5', 'FATAL', family=invalid_ssn_affiliation.family, adult=invalid_ssn_affiliation) 
-
-    def validate_child_race_ethnicity(self):
-        #IF ITEM 70A = BLANK ITEM 67 MUST = 4
-        #IF ITEM 67= 1-3, ITEM 34A MUST = 1 OR 2
-        exclude_list = [1,2]
-        exclude_affiliation_list = [1,2,3]
-        invalid_race_affiliations = Child.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34a_hispanic_latino__in = exclude_list)
-        blank_race_affilitations = Child.objects.filter(item34a_hispanic_latino='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:
-            self.create_validation_error('T1-075', '70', 'RACE/ETHNICITY', \
-                        'IF ITEM 70A = BLANK ITEM 67 MUST = 4', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-
-        for invalid_race_affiliation in invalid_race_affiliations:
-            self.create_validation_error('T1-076', '70', 'RACE/ETHNICITY', \
-                                    'IF ITEM 67= 1-3, ITEM 70A MUST = 1 OR 2', 'FATAL', family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-        invalid_race_affiliations = Child.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34b_american_indian_alaska_native__in = exclude_list)
-        blank_race_affilitations = Child.objects.filter(item34b_american_indian_alaska_native='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:
-            self.create_validation_error('T1-077', '70', 'RACE/ETHNICITY', 'IF ITEM 70B = BLANK ITEM 67 MUST = 4', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-        for invalid_race_affiliation in invalid_race_affiliations:
-                        self.create_validation_error('T1-078', '70', 'RACE/ETHNICITY', 'IF ITEM 67= 1-3, ITEM 70B MUST = 1 OR 2', 'FATAL',family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-    
-        invalid_race_affiliations = Child.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34c_asian__in = exclude_list)
-        blank_race_affilitations = Child.objects.filter(item34c_asian='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:
-            self.create_validation_error('T1-079', '70', 'RACE/ETHNICITY','IF ITEM 70C = BLANK ITEM 67 MUST = 4', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-        for invalid_race_affiliation in invalid_race_affiliations:
-            self.create_validation_error('T1-079', '70', 'RACE/ETHNICITY', 'IF ITEM 67= 1-3, ITEM 70C MUST = 1 OR 2', 'FATAL', family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-        invalid_race_affiliations = Child.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34d_black__in = exclude_list)
-        blank_race_affilitations = Child.objects.filter(item34d_black='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:
-                        self.create_validation_error('T1-080', '70', 'RACE/ETHNICITY','IF ITEM 70D = BLANK ITEM 67 MUST = 4', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-        for invalid_race_affiliation in invalid_race_affiliations:        
-            self.create_validation_error('T1-081', '70', 'RACE/ETHNICITY','IF ITEM 70D = BLANK ITEM 67 MUST = 4', 'FATAL',family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-        invalid_race_affiliations = Child.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34e_native_pacific_islander__in = exclude_list)
-        blank_race_affilitations = Child.objects.filter(item34e_native_pacific_islander='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:        
-            self.create_validation_error('T1-082', '70', 'RACE/ETHNICITY', 'IF ITEM 70E = BLANK ITEM 67 MUST = 4', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)
-
-        for invalid_race_affiliation in invalid_race_affiliations:
-            self.create_validation_error('T1-083', '70', 'RACE/ETHNICITY', 'IF ITEM 67= 1-3, ITEM 70E MUST = 1 OR 2', 'FATAL', family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-        invalid_race_affiliations = Child.objects.filter(family_affiliation__in=exclude_affiliation_list).exclude(item34f_white__in = exclude_list)
-        blank_race_affilitations = Child.objects.filter(item34f_white='', family_affiliation__in=exclude_affiliation_list)
-        for blank_race_affilitation in blank_race_affilitations:        
-            self.create_validation_error('T1-084', '70', 'RACE/ETHNICITY', 'IF ITEM 70F = BLANK ITEM 67 MUST = 4', 'FATAL', family=blank_race_affilitation.family, adult=blank_race_affilitation)            
-
-        for invalid_race_affiliation in invalid_race_affiliations:
-            self.create_validation_error('T1-085', '70', 'RACE/ETHNICITY', 'IF ITEM 67= 1-3, ITEM 67F MUST = 1 OR 2', 'FATAL',family=invalid_race_affiliation.family, adult=invalid_race_affiliation)
-
-    def validate_child_relationship_to_hoh(self):
-        #ITEM 73 MUST = 01-10
-        exclude_list = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10']
-        invalid_hoh_relations = Child.objects.exclude(relation_to_hoh__in=exclude_list)
-
-        for invalid_hoh_relation in invalid_hoh_relations:
-            self.create_validation_error('T1-087', '73', 'RELATIONSHIP TO HEAD OF HOUSEHOLD', 'ITEM 73 MUST = 01-10', 'FATAL', family=invalid_hoh_relation.family, adult=invalid_hoh_relation) 
-
-    def validate_child_parent_with_minor(self):
-        #IF ITEM 74 = BLANK THEN ITEM 67 MUST = 4-5
-        #IF ITEM 67 = 1,2,3 ITEM 74 MUST = 1-3
-        exclude_list = [1,2,3]
-        exclude_affiliation_list1 = [1,2,3]
-        exclude_affiliation_list2 = [4,5]
-        invalid_39_affiliations = Child.objects.filter(parent_with_minor_child='', parent_with_minor_child__isnull=True, ).exclude(family_affiliation__in=exclude_affiliation_list2)
-        invalid_39s = Child.objects.filter(family_affiliation__in=exclude_affiliation_list1).exclude(parent_with_minor_child__in=exclude_list)
-        for invalid_39_affiliation in invalid_39_affiliations:
-            self.create_validation_error('T1-088', '74', 'PARENT WITH MINOR CHILD IN THE FAMILY','IF ITEM 74 = BLANK, ITEM 67 MUST = 4 OR 5', 'FATAL', family=invalid_39_affiliation.family, adult=invalid_39_affiliation)
-            
-        for invalid_39 in invalid_39s:
-            self.create_validation_error('T1-089', '74', 'PARENT WITH MINOR CHILD IN THE FAMILY', 'IF ITEM 67 = 1,2,3 , ITEM 74 MUST = 1-3', 'FATAL', family=invalid_39.family, adult=invalid_39)
-
-    def validate_education_level(self):
-        #IF ITEM 67 = 2,3,5 ITEM 75 MUST = 01-16,98,99
-        #IF ITEM 67 = 1 ITEM 75 MUST = 01-16,98
-        #IF ITEM 75 = BLANK, ITEM 67 MUST = 4
-        exclude_list1 = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12', '13', '14', '15', '16', '98', '99']
-        exclude_list2 = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12', '13', '14', '15', '16', '98', '99']
-        exclude_affiliation_list1 = [2,3,4,5]
-        exclude_affiliation_list2 = [1]
-        exclude_affiliation_list3 = [1,2,3,4]
-        excluded_affiliation_adult_list = Child.objects.exclude(family_affiliation__in=exclude_affiliation_list1)
-        invalid_41_affiliations = excluded_affiliation_adult_list.exclude(educational_level__in=exclude_list1)
-        invalid_41s = Child.objects.filter(family_affiliation__in=exclude_affiliation_list2).exclude(educational_level__in=exclude_list2)
-        invalid_41bs = Child.objects.filter(educational_level=4).exclude(family_affiliation__in=exclude_affiliation_list3)
-        for invalid_41_affiliation in invalid_41_affiliations:
-            self.create_validation_error('T1-090', '75', 'EDUCATION LEVEL','IF ITEM 67 = 2-5 ITEM 75 MUST =? 01-16,98,99', 'FATAL', family=invalid_41_affiliation.family,adult=invalid_41_affiliation)
-
-        for invalid_41 in invalid_41s:
-            self.create_validation_error('T1-091', '75', 'EDUCATION LEVEL', 'IF ITEM 67 = 1, ITEM 75 MUST = 01-16,98', 'FATAL',family=invalid_41.family,adult=invalid_41)
-
-        for invalid_41b in invalid_41bs:
-            self.create_validation_error('T1-092', '75', 'EDUCATION LEVEL', 'IF ITEM 75 = BLANK, ITEM 67 MUST = 4', 'FATAL', family=invalid_41b.family, adult=invalid_41b)
-
-    def validate_citizenship_immigration_status(self):
-        #IF ITEM 76 = BLANK ITEM 67? MUST = 4
-        #IF ITEM 67 = 1-3,5 ITEM 76 MUST = 1-2, OR 9
-        exclude_list = [1,2,9]
-        exclude_affiliation_list1 = [1,2,3,5]
-        exclude_affiliation_list2 = [4]
-        excluded_affiliation_adult_list = Child.objects.exclude(family_affiliation__in=exclude_affiliation_list1)
-        invalid_39_affiliations = excluded_affiliation_adult_list.exclude(citizenship_immigration_status__in=exclude_list)
-        invalid_39s = Child.objects.filter(family_affiliation__in=exclude_affiliation_list2).exclude(citizenship_immigration_status='')
-        for invalid_39_affiliation in invalid_39_affiliations:
-            self.create_validation_error('T1-093', '76', 'CITIZENSHIP/ALIENAGE','IF ITEM 76 = BLANK, ITEM 67? MUST = 4', 'FATAL', family=invalid_39_affiliation.family,adult=invalid_39_affiliation)
-        
-        for invalid_39 in invalid_39s:
-            self.create_validation_error('T1-094', '76', 'CITIZENSHIP/ALIENAGE', 'IF ITEM 76 = 1-3,5, ITEM 42 MUST = 1-2,9', 'FATAL', family=invalid_39.family,adult=invalid_39)
\ No newline at end of file
+        # Results may still be sitting in the buffer, so count them there.
+        if self.results.count == 0:
+            self.create_validation_error('T-000', '000', 'NO ERRORS','NO ERRORS', 'NO ERRORS')
@@ -1,3 +1,924 @@
-from django.test import TestCase
+import datetime
+import csv
+import gzip
+import io
+import os
+import pickle
+import random
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from .models import Quarter, Month, Family, Adult, Child, ValidationResult, ValidationRun, ValidationRuleStat, ValidationSummary, BackgroundJob, FileUpload, ImportError, GeneratedFile, ExportSegment
+from .frames import load_frame, build_mask
+from .forms import FamilyForm, AdultForm, ChildForm
+from .ingest import (expected_headers, make_loader, TransmissionLoader, UPLOAD_FORMS, IngestPlan,
+                     parse_csv_parallel, parse_transmission_parallel, SplitRecord)
+from .layouts import LAYOUTS
+from . import export
+from .export import quarter_records, save_quarter
+from .edits import EDITS, FAMILY, ADULT, CHILD, catalog_version, edits_by_record_type
+from .jobs import VALIDATION, QUARTER_EXPORT, enqueue, claim_next, run_job
+from .views import ValidateDataView, process_sheets, process_file_parallel
+from .tasks import DataValidator, scan_failures, scan_partition
+
+FAMILY_ROW = {
+    'case_number': '00000000001', 'county_fips_code': '001', 'stratum': '01', 'zip_code': '12345',
+    'funding_stream': '1', 'disposition': '1', 'new_applicant': '1', 'num_family_members': '03',
+    'family_type': '1', 'receives_subsidized_housing': '3', 'receives_medical_assistance': '1',
+    'snap_amount': '0100', 'subsid_child_care_amount': '0000', 'child_support_amount': '0000',
+    'family_cash_resources': '0000', 'item21a_amount': '0000', 'item21b_nbr_month': '000',
+    'item22a_amount': '0000', 'item22b_children_covered': '00', 'item22c_nbr_months': '000',
+    'item23a_amount': '0000', 'item23b_nbr_months': '000', 'item26a1_sanc_redux_amt': '0000',
+    'item26a2_work_req_sanction': '2', 'item26a4_teen_prnt_schl_attend_sanc': '2',
+    'item26a5_child_support_non_coop': '2', 'item26a6_irp_non_coop': '2', 'item26a7_other_sanction': '2',
+    'item26b_recoupment': '0000', 'item26c1_other_tot_red_amount': '0000', 'item26c2_family_cap': '2',
+    'item26c3_red_len_assist': '2', 'item26c4_other_non_sanction': '2', 'fam_exempt_fed_time_limits': '01',
+}
+
+ADULT_HOUR_FIELDS = [
+    'unsubsidized_employment_hours', 'subsidized_private_employment_hours', 'subsidized_public_employment_hours',
+    'item53a_wex_participation', 'item53b_wex_excused_absences', 'item53c_wex_holidays', 'on_job_training_hours',
+    'item55a_jobsearch_participation', 'item55b_jobsearch_excused_absences', 'item55c_jobsearch_holidays',
+    'item56a_commsvs_participation', 'item56b_commsvs_excused_absences', 'item56c_commsvs_holidays',
+    'item57a_voced_participation', 'item57b_voced_excused_absences', 'item57c_voced_holidays',
+    'item58a_jst_participation', 'item58b_jst_excused_absences', 'item58c_jst_holidays',
+    'item59a_emped_hsd_participation', 'item59b_emped_hsd_excused_absences', 'item59c_emped_hsd_holidays',
+    'item60a_schlattnd_participation', 'item60b_schlattnd_excused_absences', 'item60c_schlattnd_holidays',
+    'item61a_chldcare_participation', 'item61b_chldcare_excused_absences', 'item61c_chldcare_holidays',
+    'other_work_activities', 'deemed_core_hours_overall_rate', 'deemed_core_hours_two_parent_rate',
+]
+
+ADULT_ROW = dict({
+    'family_affiliation': '1', 'noncustodial_parent': '2', 'date_of_birth': '19800101', 'ssn': '123456789',
+    'item34a_hispanic_latino': '2', 'item34b_american_indian_alaska_native': '2', 'item34c_asian': '2',
+    'item34d_black': '1', 'item34e_native_pacific_islander': '2', 'item34f_white': '2', 'gender': '2',
+    'item36a_receives_oasdi': '2', 'item36b_receives_federal_disability': '2',
+    'item36c_receives_title_xiv_apdt': '2', 'item36e_receives_xvi_ssi': '2', 'marital_status': '1',
+    'relationship_to_hoh': '01', 'parent_with_minor_child': '2', 'educational_level': '12',
+    'citizenship_immigration_status': '1', 'coop_child_support': '1', 'countable_federal_time_limit_months': '012',
+    'employment_status': '2', 'work_eligible_individual': '01', 'work_participation_status': '18',
+    'earned_income': '0000', 'item66b_social_security': '0000', 'item66c_ssi': '0000',
+    'item66d_worker_comp': '0000', 'item66e_other_unearned_income': '0000',
+}, **{field: '00' for field in ADULT_HOUR_FIELDS})
+
+CHILD_ROW = {
+    'family_affiliation': '1', 'date_of_birth': '20150101', 'ssn': '987654321', 'item34a_hispanic_latino': '2',
+    'item34b_american_indian_alaska_native': '2', 'item34c_asian': '2', 'item34d_black': '1',
+    'item34e_native_pacific_islander': '2', 'item34f_white': '2', 'gender': '1', 'disability_non_ssa': '2',
+    'item72b_ssi_xvi_ssi': '2', 'relation_to_hoh': '04', 'parent_with_minor_child': '3', 'educational_level': '03',
+    'citizenship_immigration_status': '1', 'item77a_ssa': '0000', 'item77b_other_unearned_income': '0000',
+}
+
+# Values that trip the various edits when swapped into an otherwise clean row.
+BAD_VALUES = ['', '0', '3', '4', '5', '7', '9', '99', '99999999', '999999999']
+
+
+def build_month(user, quarter, report_month, cases, seed=0):
+    """Create a month of cases where roughly one field in six is replaced with a bad value."""
+    rnd = random.Random(seed)
+    month = Month.objects.create(report_month=report_month, quarter=quarter,
+                                 start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 31))
+
+    def scramble(row, fields, values=BAD_VALUES):
+        row = dict(row)
+        for field in fields:
+            if rnd.random() < 0.15:
+                row[field] = rnd.choice(values)
+        return row
+
+    for case in range(cases):
+        family = Family.objects.create(
+            month=month, created_by=user, updated_by=user,
+            # Family.save() only accepts digits, so blanks are left out here.
+            **dict(scramble(FAMILY_ROW, ['disposition', 'family_type', 'num_family_members'], BAD_VALUES[1:]),
+                   case_number=str(case).zfill(11)))
+        for index in range(rnd.randint(0, 3)):
+            row = scramble(ADULT_ROW, list(ADULT_ROW))
+            row['ssn'] = row['ssn'] if row['ssn'] in ('', '999999999') else str(index).zfill(9)
+            Adult.objects.create(family=family, created_by=user, updated_by=user, **row)
+        for index in range(rnd.randint(0, 3)):
+            row = scramble(CHILD_ROW, list(CHILD_ROW))
+            row['ssn'] = row['ssn'] if row['ssn'] in ('', '999999999') else str(100 + index).zfill(9)
+            Child.objects.create(family=family, created_by=user, updated_by=user, **row)
+    return month
+
+
+class DataValidatorEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='validator')
+        quarter = Quarter.objects.create(report_quarter='2024Q1', start_date=datetime.date(2024, 1, 1),
+                                         end_date=datetime.date(2024, 3, 31))
+        build_month(cls.user, quarter, '202401', cases=60, seed=1)
+        build_month(cls.user, quarter, '202402', cases=20, seed=2)
+
+    def results(self, version):
+        return sorted(
+            ValidationResult.objects.filter(report_month='202401', version=version).values_list(
+                'edit_type', 'edit_number', 'item_number', 'description', 'edit_values',
+                'family_id', 'adult_id', 'child_id'))
+
+    def run_engine(self, engine, version):
+        DataValidator(self.user, version, '202401', engine=engine).perform_validation()
+        return self.results(version)
+
+    def test_set_engine_matches_orm_engine(self):
+        orm_results = self.run_engine(DataValidator.ENGINE_ORM, 1)
+        self.assertTrue(orm_results)
+        self.assertEqual(self.run_engine(DataValidator.ENGINE_SET, 2), orm_results)
+
+    def test_frame_mask_leaves_unsupported_lookups_to_the_database(self):
+        families = Family.objects.filter(month__report_month='202401')
+        frame = load_frame(families)
+        rule = families.filter(Q(case_number__startswith='0000000001') | Q(disposition='3'))
+        self.assertEqual(sorted(frame[build_mask(rule, frame)]['id']), sorted(rule.values_list('pk', flat=True)))
+
+    def test_pandas_engine_matches_orm_engine(self):
+        orm_results = self.run_engine(DataValidator.ENGINE_ORM, 1)
+        self.assertTrue(orm_results)
+        self.assertEqual(self.run_engine(DataValidator.ENGINE_PANDAS, 2), orm_results)
+
+    def test_set_engine_scans_each_table_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.run_engine(DataValidator.ENGINE_SET, 1)
+        # Row counts for the run's rule statistics are separate COUNT queries.
+        selects = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT') and 'section1_validationresult' not in query['sql']
+                   and not query['sql'].startswith('SELECT COUNT(')]
+        self.assertEqual(len(selects), 3)
+
+    def test_pandas_engine_evaluates_catalog_edits_on_the_frames(self):
+        # One read per table; no edit falls back to the database.
+        with CaptureQueriesContext(connection) as queries:
+            self.run_engine(DataValidator.ENGINE_PANDAS, 1)
+        selects = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT') and 'section1_validationresult' not in query['sql']]
+        self.assertEqual(len(selects), 3)
+
+    def test_case_partitions_cover_month_once(self):
+        # The pool itself needs a database other processes can open, so the
+        # partition scans run in-process here from pickled queries.
+        validator = DataValidator(self.user, 1, '202401', engine=DataValidator.ENGINE_SET, workers=4)
+        ranges = validator.case_ranges()
+        self.assertEqual(len(ranges), 4)
+        for record_type, edits in edits_by_record_type().items():
+            partitions = list(validator.partitions(record_type, ranges))
+            pks = [pk for partition in partitions for pk in partition.values_list('pk', flat=True)]
+            self.assertCountEqual(pks, validator.records(record_type).values_list('pk', flat=True))
+
+            merged = [[] for _ in edits]
+            for partition in partitions:
+                query = pickle.loads(pickle.dumps(partition.query))
+                failures, seconds, queries = scan_partition(partition.model, query, edits)
+                self.assertEqual(queries, 1)
+                for keys, found in zip(merged, failures):
+                    keys.extend(found)
+            full = scan_failures(validator.records(record_type), edits)
+            self.assertEqual([sorted(keys) for keys in merged], [sorted(keys) for keys in full])
+
+    def test_run_records_rule_stats(self):
+        run = DataValidator(self.user, 1, '202401', engine=DataValidator.ENGINE_ORM).perform_validation()
+        stats = {stat.edit_number: stat for stat in run.rule_stats.all()}
+        self.assertEqual(set(stats), {edit.edit_number for edit in EDITS})
+        self.assertEqual(sum(stat.errors_found for stat in stats.values()), run.errors_found)
+        self.assertEqual(stats['T1-008'].rows_scanned, Family.objects.filter(month__report_month='202401').count())
+        self.assertTrue(all(stat.queries >= 1 and stat.seconds is not None for stat in stats.values()))
+
+        run = DataValidator(self.user, 2, '202401', engine=DataValidator.ENGINE_SET).perform_validation()
+        scans = run.rule_stats.filter(edit_number='')
+        self.assertEqual(sorted(scans.values_list('record_type', flat=True)), [ADULT, CHILD, FAMILY])
+        self.assertEqual(sum(scans.values_list('queries', flat=True)), 3)
+        self.assertEqual(sum(scans.values_list('errors_found', flat=True)), run.errors_found)
+
+        self.client.force_login(self.user)
+        page = self.client.get(reverse('validation_run', kwargs={'month': 202401, 'version': 2}))
+        self.assertContains(page, 'T1-008')
+
+    def test_dashboard_reads_summary_in_one_query(self):
+        self.run_engine(DataValidator.ENGINE_SET, 1)
+        self.run_engine(DataValidator.ENGINE_SET, 2)
+        DataValidator(self.user, 1, '202402', engine=DataValidator.ENGINE_SET).perform_validation()
+        with CaptureQueriesContext(connection) as queries:
+            stats = ValidateDataView().get_month_stats()
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertEqual([(stat['month'], stat['version']) for stat in stats], [('202401', 2), ('202402', 1)])
+        fatal = ValidationResult.objects.filter(report_month='202401', version=2, edit_type='FATAL').count()
+        self.assertEqual(stats[0]['errors_count'], fatal)
+
+    def test_results_stay_within_report_month(self):
+        self.run_engine(DataValidator.ENGINE_SET, 1)
+        months = set(ValidationResult.objects.filter(version=1).values_list('family__month__report_month', flat=True))
+        self.assertEqual(months, {'202401'})
+
+    def test_failed_write_leaves_no_partial_results(self):
+        write = ValidationResult.objects.bulk_create
+
+        def write_then_fail(results, **kwargs):
+            write(results, **kwargs)
+            raise DatabaseError('disk full')
+
+        validator = DataValidator(self.user, 1, '202401', engine=DataValidator.ENGINE_SET, batch_size=10)
+        with mock.patch.object(ValidationResult.objects, 'bulk_create', side_effect=write_then_fail):
+            with self.assertRaises(DatabaseError):
+                validator.perform_validation()
+        self.assertFalse(ValidationRun.objects.exists())
+        self.assertFalse(ValidationResult.objects.exists())
+
+    def test_failed_summary_write_rolls_back_the_run(self):
+        # The summary rows are written last, after the run, its results and its rule stats.
+        validator = DataValidator(self.user, 1, '202401', engine=DataValidator.ENGINE_SET)
+        with mock.patch.object(ValidationSummary.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                validator.perform_validation()
+        self.assertFalse(ValidationRun.objects.exists())
+        self.assertFalse(ValidationResult.objects.exists())
+        self.assertFalse(ValidationRuleStat.objects.exists())
+
+    def test_catalog_edits_flag_bad_values(self):
+        family = Family.objects.filter(month__report_month='202401').first()
+        Family.objects.filter(pk=family.pk).update(disposition='3')
+        adult = Adult.objects.create(family=family, created_by=self.user, updated_by=self.user,
+                                     **dict(ADULT_ROW, ssn='555555555', educational_level='99'))
+        self.run_engine(DataValidator.ENGINE_SET, 1)
+        results = ValidationResult.objects.filter(version=1)
+        self.assertTrue(results.filter(edit_number='T1-008', family=family, adult=None).exists())
+        self.assertEqual(list(results.filter(adult=adult).values_list('edit_number', flat=True)), ['T1-037'])
+
+
+class EditCatalogTests(TestCase):
+
+    def test_edit_numbers_are_unique(self):
+        numbers = [edit.edit_number for edit in EDITS]
+        self.assertEqual(len(numbers), len(set(numbers)))
+
+    def test_edits_reference_model_fields(self):
+        models = {FAMILY: Family, ADULT: Adult, CHILD: Child}
+        for edit in EDITS:
+            fields = [edit.field, *edit.conditions()]
+            for field in fields:
+                models[edit.record_type]._meta.get_field(field)
+
+
+class IncrementalValidationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='validator')
+        quarter = Quarter.objects.create(report_quarter='2024Q1', start_date=datetime.date(2024, 1, 1),
+                                         end_date=datetime.date(2024, 3, 31))
+        build_month(cls.user, quarter, '202401', cases=30, seed=3)
+
+    def results(self, version):
+        return sorted(
+            ValidationResult.objects.filter(report_month='202401', version=version).values_list(
+                'edit_number', 'family_id', 'adult_id', 'child_id'))
+
+    def test_incremental_run_matches_full_run(self):
+        DataValidator(self.user, 1, '202401', engine=DataValidator.ENGINE_SET).perform_validation()
+        adult = Adult.objects.filter(family__month__report_month='202401').first()
+        adult.educational_level = '99'
+        adult.save()
+        family = Family.objects.filter(month__report_month='202401').last()
+        family.disposition = '3'
+        family.save()
+
+        run = DataValidator(self.user, 2, '202401', engine=DataValidator.ENGINE_SET,
+                            incremental=True).perform_validation()
+        DataValidator(self.user, 3, '202401', engine=DataValidator.ENGINE_SET).perform_validation()
+        self.assertTrue(run.incremental)
+        self.assertIsNotNone(run.finished_at)
+        self.assertIn(('T1-037', adult.family_id, adult.pk, None), self.results(2))
+        self.assertEqual(self.results(2), self.results(3))
+
+    def test_incremental_run_after_a_catalog_change_checks_everything(self):
+        # The previous run did not have T1-037, so no untouched record carries its results.
+        DataValidator(self.user, 1, '202401', engine=DataValidator.ENGINE_SET).perform_validation(
+            [edit for edit in EDITS if edit.edit_number != 'T1-037'])
+        run = DataValidator(self.user, 2, '202401', engine=DataValidator.ENGINE_SET,
+                            incremental=True).perform_validation()
+        DataValidator(self.user, 3, '202401', engine=DataValidator.ENGINE_SET).perform_validation()
+        self.assertEqual(run.catalog_version, catalog_version())
+        self.assertIn('T1-037', {edit_number for edit_number, *_ in self.results(2)})
+        self.assertEqual(self.results(2), self.results(3))
+
+    def test_incremental_without_previous_run_checks_everything(self):
+        DataValidator(self.user, 1, '202401', engine=DataValidator.ENGINE_SET, incremental=True).perform_validation()
+        DataValidator(self.user, 2, '202401', engine=DataValidator.ENGINE_SET).perform_validation()
+        self.assertEqual(self.results(1), self.results(2))
+
+
+class ValidationJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='validator')
+        quarter = Quarter.objects.create(report_quarter='2024Q1', start_date=datetime.date(2024, 1, 1),
+                                         end_date=datetime.date(2024, 3, 31))
+        build_month(cls.user, quarter, '202401', cases=10, seed=4)
+
+    def test_post_queues_validation_and_worker_runs_it(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('validate_data'), {'report_month': '202401'})
+        self.assertRedirects(response, reverse('validate_data'))
+        job = BackgroundJob.objects.get()
+        self.assertEqual(job.status, BackgroundJob.PENDING)
+        self.assertFalse(ValidationResult.objects.exists())
+
+        call_command('run_jobs', once=True, stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.DONE, job.error)
+        self.assertEqual(job.steps_done, len(EDITS))
+        self.assertEqual(job.result['version'], 1)
+        self.assertEqual(ValidationResult.objects.filter(version=1).count(), job.errors_found)
+
+        progress = self.client.get(reverse('job_progress', kwargs={'pk': job.pk})).json()
+        self.assertEqual(progress['status'], BackgroundJob.DONE)
+        self.assertEqual(progress['steps_total'], len(EDITS))
+
+    def test_failed_job_keeps_traceback(self):
+        job = enqueue(VALIDATION, self.user, report_month='209912')
+        run_job(claim_next())
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.FAILED)
+        self.assertIn('does not exist', job.error)
+        self.assertIsNone(claim_next())
+
+    @override_settings(JOB_TIMEOUT=60)
+    def test_job_of_a_dead_worker_is_marked_failed(self):
+        job = enqueue(VALIDATION, self.user, report_month='202401')
+        self.assertEqual(claim_next().pk, job.pk)
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - datetime.timedelta(minutes=2))
+
+        self.client.force_login(self.user)
+        progress = self.client.get(reverse('job_progress', kwargs={'pk': job.pk})).json()
+        self.assertEqual(progress['status'], BackgroundJob.FAILED)
+        self.assertEqual(progress['error'], 'Worker stopped responding: no progress for 60 seconds.')
+        self.assertContains(self.client.get(reverse('validate_data')), progress['error'])
+        self.assertIsNone(claim_next())
+
+
+def family_csv(rows, fieldnames=list(FAMILY_ROW)):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode('utf-8')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class FileUploadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='uploader')
+        quarter = Quarter.objects.create(report_quarter='2024Q1', start_date=datetime.date(2024, 1, 1),
+                                         end_date=datetime.date(2024, 3, 31))
+        cls.month = Month.objects.create(report_month='202401', quarter=quarter,
+                                         start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 31))
+
+    def upload(self, content, model_type='family', name='families.csv', follow=False, **options):
+        self.client.force_login(self.user)
+        return self.client.post(reverse('file_upload', kwargs={'month_id': self.month.pk}), dict({
+            'month': '202401', 'model_type': model_type, 'file': SimpleUploadedFile(name, content)}, **options),
+            follow=follow)
+
+    # Anything over the in-memory limit is spooled to disk and streamed from there.
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_csv_upload_is_streamed_from_disk(self):
+        rows = [dict(FAMILY_ROW, case_number=str(case).zfill(11)) for case in range(25)]
+        response = self.upload(family_csv(rows))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Family.objects.filter(month=self.month).count(), 25)
+        self.assertEqual(FileUpload.objects.count(), 1)
+
+    def test_csv_upload_rejects_unexpected_headers(self):
+        response = self.upload(b'case_number,not_a_field\n00000000001,1\n')
+        self.assertContains(response, 'File headers do not match expected fields.')
+        self.assertFalse(Family.objects.exists())
+
+    def test_bulk_ingest_matches_family_form(self):
+        rows = [
+            dict(FAMILY_ROW, case_number='1', stratum='1'),
+            dict(FAMILY_ROW, case_number='2', disposition='X'),
+            dict(FAMILY_ROW, case_number='3', county_fips_code=''),
+            dict(FAMILY_ROW, case_number='4', zip_code='ABCDE'),
+            dict(FAMILY_ROW, case_number='1'),
+        ]
+        response = self.upload(family_csv(rows))
+        self.assertEqual(response.status_code, 302)
+        family = Family.objects.get(month=self.month)
+        self.assertEqual((family.case_number, family.stratum), ('00000000001', '01'))
+
+        upload = FileUpload.objects.get()
+        self.assertEqual((upload.rows_loaded, upload.rows_rejected), (1, 4))
+        errors = {error.line: error.details for error in ImportError.objects.filter(upload=upload)}
+        self.assertEqual(sorted(errors), [3, 4, 5, 6])
+        for line in (3, 4):
+            self.assertEqual(errors[line]['errors'], FamilyForm(data=errors[line]['row']).errors.get_json_data())
+        self.assertEqual(errors[5]['errors']['zip_code'][0]['code'], 'invalid')
+        self.assertEqual(errors[6]['errors']['__all__'][0]['message'],
+                         'Family with this Month and Case number already exists.')
+
+    def test_adult_and_child_rows_resolve_family_by_case_number(self):
+        self.upload(family_csv([dict(FAMILY_ROW, case_number=str(case)) for case in (1, 2)]))
+        families = dict(Family.objects.values_list('case_number', 'pk'))
+        adults = [
+            dict(ADULT_ROW, case_number='1'),
+            dict(ADULT_ROW, case_number='00000000002', ssn='222222222', item59a_emped_hsd_participation='01',
+                 item60a_schlattnd_participation='02', item61a_chldcare_participation='03'),
+            dict(ADULT_ROW, case_number='3'),
+            dict(ADULT_ROW, case_number='1', date_of_birth='19801340'),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            self.upload(family_csv(adults, expected_headers(AdultForm)), model_type='adult', name='adults.csv')
+        # Case numbers resolve in one query; the other reads of the table are the
+        # merge's check that the families still exist and the upload's data fingerprint.
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if 'FROM "section1_family"' in query['sql']
+                              and 'COUNT(' not in query['sql'] and 'EXISTS' not in query['sql']]), 1)
+        self.assertEqual(sorted(Adult.objects.values_list('family_id', flat=True)),
+                         [families['00000000001'], families['00000000002']])
+        self.assertEqual(Adult.objects.get(ssn='222222222').item59a_emped_hsd_participation, '06')
+
+        upload = FileUpload.objects.get(model_type='adult')
+        errors = {error.line: error.details['errors'] for error in ImportError.objects.filter(upload=upload)}
+        self.assertEqual(errors[4]['case_number'][0]['code'], 'invalid_choice')
+        form = AdultForm(data=dict(adults[3], family=families['00000000001']))
+        self.assertEqual(errors[5], form.errors.get_json_data())
+
+        self.upload(family_csv([dict(CHILD_ROW, case_number='2')], expected_headers(ChildForm)),
+                    model_type='child', name='children.csv')
+        self.assertEqual(Child.objects.get().family_id, families['00000000002'])
+
+    def test_upsert_updates_changed_rows_and_deletes_missing(self):
+        self.upload(family_csv([dict(FAMILY_ROW, case_number=str(case)) for case in (1, 2, 3)]))
+        stamps = dict(Family.objects.values_list('case_number', 'updated_at'))
+        rows = [dict(FAMILY_ROW, case_number='1'), dict(FAMILY_ROW, case_number='2', snap_amount='200'),
+                dict(FAMILY_ROW, case_number='4')]
+        response = self.upload(family_csv(rows), upsert='on', delete_missing='on')
+        self.assertEqual(response.status_code, 302)
+
+        upload = FileUpload.objects.latest('pk')
+        self.assertEqual((upload.rows_loaded, upload.rows_updated, upload.rows_deleted, upload.rows_rejected),
+                         (1, 1, 1, 0))
+        families = {family.case_number: family for family in Family.objects.all()}
+        self.assertEqual(sorted(families), ['00000000001', '00000000002', '00000000004'])
+        self.assertEqual(families['00000000002'].snap_amount, '0200')
+        self.assertEqual(families['00000000001'].updated_at, stamps['00000000001'])
+        self.assertNotEqual(families['00000000002'].updated_at, stamps['00000000002'])
+
+    def test_workbook_loads_family_adult_and_child_sheets(self):
+        workbook = openpyxl.Workbook()
+        workbook.remove(workbook.active)
+        sheets = {
+            # Excel keeps whole numbers as numbers, e.g. case numbers without their zeros.
+            'Family': [dict(FAMILY_ROW, case_number=case, funding_stream=1) for case in (1, 2)],
+            # A blank row is skipped but still counts for the line numbers of the rows after it.
+            'Adult': [dict(ADULT_ROW, case_number=1), {}, dict(ADULT_ROW, case_number=9)],
+            'Child': [dict(CHILD_ROW, case_number=2)],
+        }
+        for title, rows in sheets.items():
+            worksheet = workbook.create_sheet(title)
+            headers = list(FAMILY_ROW) if title == 'Family' else expected_headers(UPLOAD_FORMS[title.lower()])
+            worksheet.append(headers)
+            for row in rows:
+                worksheet.append([row.get(header) for header in headers] if row else [])
+            worksheet.append([])
+        content = io.BytesIO()
+        workbook.save(content)
+
+        response = self.upload(content.getvalue(), name='month.xlsx')
+        self.assertEqual(response.status_code, 302)
+        families = dict(Family.objects.values_list('case_number', 'pk'))
+        self.assertEqual(sorted(families), ['00000000001', '00000000002'])
+        self.assertEqual(Adult.objects.get().family_id, families['00000000001'])
+        self.assertEqual(Child.objects.get().family_id, families['00000000002'])
+
+        upload = FileUpload.objects.get()
+        self.assertEqual((upload.rows_loaded, upload.rows_rejected), (4, 1))
+        error = ImportError.objects.get(upload=upload)
+        self.assertEqual(error.model_type, 'adult')
+        self.assertEqual(error.line, 4)
+
+    def test_identical_upload_reuses_earlier_result_and_blob(self):
+        content = family_csv([FAMILY_ROW, dict(FAMILY_ROW, case_number='2', disposition='9')])
+        self.upload(content)
+        first = FileUpload.objects.get()
+
+        response = self.upload(content, name='again.csv', follow=True)
+        self.assertContains(response, 'identical to the one uploaded on')
+        self.assertEqual(FileUpload.objects.count(), 1)
+        self.assertEqual(ImportError.objects.count(), 1)
+
+        # Once another file went in, the same bytes are loaded again but not stored again.
+        self.upload(family_csv([dict(FAMILY_ROW, case_number='3')]), upsert='on')
+        self.upload(content, name='third.csv', upsert='on')
+        latest = FileUpload.objects.latest('pk')
+        self.assertEqual(FileUpload.objects.count(), 3)
+        self.assertEqual(latest.file.name, first.file.name)
+        self.assertEqual((latest.rows_loaded, latest.rows_rejected), (0, 1))
+
+    def test_identical_upload_is_loaded_again_with_other_options(self):
+        original = family_csv([FAMILY_ROW])
+        corrected = family_csv([dict(FAMILY_ROW, snap_amount='0200')])
+        self.upload(original)
+        self.upload(corrected)
+        self.assertEqual(FileUpload.objects.latest('pk').rows_rejected, 1)
+
+        # The same bytes again, but with upsert: the correction has to go in this time.
+        response = self.upload(corrected, upsert='on', follow=True)
+        self.assertNotContains(response, 'identical to the one uploaded on')
+        self.assertEqual(FileUpload.objects.latest('pk').rows_updated, 1)
+        self.assertEqual(Family.objects.get(month=self.month).snap_amount, '0200')
+
+    def test_identical_upload_is_loaded_again_after_the_month_changed(self):
+        content = family_csv([FAMILY_ROW, dict(FAMILY_ROW, case_number='2')])
+        self.upload(content)
+        Family.objects.filter(month=self.month, case_number='00000000002').delete()
+
+        self.upload(content, name='again.csv')
+        self.assertEqual(FileUpload.objects.count(), 2)
+        self.assertEqual(Family.objects.filter(month=self.month).count(), 2)
+
+    def test_incomplete_upload_is_not_reused(self):
+        content = family_csv([FAMILY_ROW])
+        with mock.patch('section1.views.record_upload', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                self.upload(content)
+        self.assertIsNone(FileUpload.objects.get().completed_at)
+        self.assertFalse(Family.objects.exists())
+
+        self.upload(content)
+        self.assertEqual(Family.objects.filter(month=self.month).count(), 1)
+        self.assertIsNotNone(FileUpload.objects.latest('pk').completed_at)
+
+    def test_value_failing_several_validators_keeps_each_error(self):
+        row = dict(FAMILY_ROW, zip_code='12\n345')
+        form = FamilyForm(data=row)
+        self.assertEqual(IngestPlan(FamilyForm).clean(row)[1]['zip_code'], form.errors.get_json_data()['zip_code'])
+
+    def test_parallel_parse_matches_sequential_line_numbers(self):
+        rows = [dict(FAMILY_ROW, case_number=str(case), disposition='9' if case % 7 == 0 else '1')
+                for case in range(300)]
+        path = os.path.join(tempfile.mkdtemp(), 'families.csv')
+        with open(path, 'wb') as file:
+            file.write(family_csv(rows))
+        plan = IngestPlan(FamilyForm)
+        with open(path, newline='') as file:
+            expected = [(line, row, *plan.clean(row)) for line, row in enumerate(csv.DictReader(file), start=2)]
+
+        # Small ranges so every worker gets several, cut mid-line and re-aligned.
+        parsed = list(parse_csv_parallel(path, 'family', workers=2, chunk_size=4000))
+        self.assertEqual([(line, values, errors) for line, row, values, errors in parsed],
+                         [(line, values, errors) for line, row, values, errors in expected])
+        # Only rejected rows carry the whole row back; it is stored with the error.
+        self.assertEqual([row for line, row, values, errors in parsed if errors],
+                         [row for line, row, values, errors in expected if errors])
+        self.assertEqual([line for line, row, values, errors in parsed if errors][:2], [2, 9])
+
+    def test_sequential_and_parallel_loads_number_blank_lines_alike(self):
+        rows = [dict(FAMILY_ROW, case_number=str(case), disposition='9' if case % 2 else '1') for case in range(4)]
+        lines = family_csv(rows).split(b'\n')
+        content = b'\n'.join(lines[:3] + [b''] + lines[3:])
+        self.upload(content)
+        sequential = list(ImportError.objects.order_by('line').values_list('line', flat=True))
+
+        Family.objects.all().delete()
+        path = os.path.join(tempfile.mkdtemp(), 'families.csv')
+        with open(path, 'wb') as file:
+            file.write(content)
+        upload = FileUpload.objects.create(month=self.month, model_type='family', uploaded_by=self.user,
+                                           file='families.csv')
+        make_loader('family', upload, self.user, self.month).load_parsed(
+            parse_csv_parallel(path, 'family', workers=2, chunk_size=100))
+        parallel = list(ImportError.objects.filter(upload=upload).order_by('line').values_list('line', flat=True))
+
+        # The header is line 1 and the blank line is line 4.
+        self.assertEqual(sequential, [3, 6])
+        self.assertEqual(parallel, sequential)
+
+    def test_rows_reach_live_tables_only_when_merged(self):
+        upload = FileUpload.objects.create(month=self.month, model_type='family', uploaded_by=self.user,
+                                           file='families.csv')
+        loader = make_loader('family', upload, self.user, self.month, batch_size=2)
+        for line, case in enumerate('123', start=2):
+            loader.add(line, dict(FAMILY_ROW, case_number=case))
+        loader.add(5, dict(FAMILY_ROW, case_number='4', disposition='9'))
+        loader.flush()
+        self.assertFalse(Family.objects.exists())
+        self.assertFalse(ImportError.objects.exists())
+
+        loader.finish()
+        self.assertEqual(Family.objects.count(), 3)
+        self.assertEqual(ImportError.objects.get().upload, upload)
+
+    def test_quoted_line_break_falls_back_to_a_sequential_load(self):
+        rows = [dict(FAMILY_ROW, case_number=str(case), disposition='9' if case % 7 == 0 else '1')
+                for case in range(100)]
+        rows[50]['zip_code'] = '12\n345'
+        path = os.path.join(tempfile.mkdtemp(), 'families.csv')
+        with open(path, 'wb') as file:
+            file.write(family_csv(rows))
+        # Small ranges, so one of them is cut inside the quoted zip code.
+        with self.assertRaises(SplitRecord):
+            list(parse_csv_parallel(path, 'family', workers=2, chunk_size=4000))
+
+        upload = self.new_upload()
+        loader = process_file_parallel(path, 'family', self.month, upload, self.user, workers=2, chunk_size=4000)
+        self.assertEqual((loader.loaded, loader.rejected), (84, 16))
+        lines = list(ImportError.objects.filter(upload=upload).order_by('line').values_list('line', flat=True))
+        # Rows after the quoted line break are one line further down.
+        self.assertEqual(lines[:8], [2, 9, 16, 23, 30, 37, 44, 51])
+        self.assertEqual(lines[8:10], [53, 59])
+
+    def test_merged_rows_are_stamped_when_merged(self):
+        self.upload(family_csv([dict(FAMILY_ROW, case_number='1')]))
+        upload = FileUpload.objects.create(month=self.month, model_type='family', uploaded_by=self.user,
+                                           file='families.csv', upsert=True)
+        loader = make_loader('family', upload, self.user, self.month, upsert=True)
+        loader.add(2, dict(FAMILY_ROW, case_number='1', snap_amount='200'))
+        loader.add(3, dict(FAMILY_ROW, case_number='2'))
+        loader.add(4, dict(FAMILY_ROW, case_number='3', disposition='9'))
+        # Anything stamped when the loader was built would miss an incremental
+        # validation run that started while the file was loading.
+        started = timezone.now()
+        loader.finish()
+
+        updated, inserted = Family.objects.order_by('case_number')
+        self.assertGreaterEqual(updated.updated_at, started)
+        self.assertLess(updated.created_at, started)
+        self.assertGreaterEqual(inserted.created_at, started)
+        self.assertGreaterEqual(inserted.updated_at, started)
+        self.assertGreaterEqual(ImportError.objects.get(upload=upload).created_at, started)
+
+    def new_upload(self, **options):
+        return FileUpload.objects.create(month=self.month, model_type='family', uploaded_by=self.user,
+                                         file='families.csv', **options)
+
+    def test_row_stored_by_a_concurrent_upload_is_rejected_at_merge(self):
+        first = make_loader('family', self.new_upload(), self.user, self.month)
+        second = make_loader('family', self.new_upload(), self.user, self.month)
+        first.add(2, dict(FAMILY_ROW, case_number='1'))
+        second.add(2, dict(FAMILY_ROW, case_number='1'))
+        second.add(3, dict(FAMILY_ROW, case_number='2'))
+        first.finish()
+
+        self.assertEqual(second.finish(), (1, 1))
+        self.assertEqual(Family.objects.count(), 2)
+        error = ImportError.objects.get(upload=second.upload)
+        self.assertEqual(error.line, 2)
+        self.assertEqual(error.details['row']['case_number'], '00000000001')
+        self.assertEqual(error.details['errors']['__all__'][0]['code'], 'unique_together')
+        self.assertEqual(list(second.upload.error_summaries.values_list('field', 'code', 'count')),
+                         [('__all__', 'unique_together', 1)])
+
+    def test_update_of_a_row_deleted_meanwhile_is_rejected_at_merge(self):
+        self.upload(family_csv([dict(FAMILY_ROW, case_number='1'), dict(FAMILY_ROW, case_number='2')]))
+        loader = make_loader('family', self.new_upload(upsert=True), self.user, self.month, upsert=True)
+        loader.add(2, dict(FAMILY_ROW, case_number='1', snap_amount='200'))
+        loader.add(3, dict(FAMILY_ROW, case_number='2', snap_amount='300'))
+        Family.objects.filter(case_number='00000000001').delete()
+        loader.finish()
+
+        self.assertEqual((loader.updated, loader.rejected), (1, 1))
+        self.assertEqual(list(Family.objects.values_list('case_number', 'snap_amount')), [('00000000002', '0300')])
+        error = ImportError.objects.get(upload=loader.upload)
+        self.assertEqual((error.line, error.details['errors']['__all__'][0]['code']), (2, 'stale'))
+
+    def test_member_of_a_family_deleted_meanwhile_is_rejected_at_merge(self):
+        self.upload(family_csv([dict(FAMILY_ROW, case_number='1')]))
+        loader = make_loader('adult', self.new_upload(), self.user, self.month)
+        loader.add(2, dict(ADULT_ROW, case_number='1'))
+        Family.objects.all().delete()
+
+        self.assertEqual(loader.finish(), (0, 1))
+        self.assertFalse(Adult.objects.exists())
+        error = ImportError.objects.get(upload=loader.upload)
+        self.assertEqual(error.details['row']['case_number'], '00000000001')
+        self.assertEqual(error.details['errors']['case_number'][0]['code'], 'invalid_choice')
+
+    def test_failed_sheet_leaves_the_counts_of_the_sheets_before_it(self):
+        upload = self.new_upload()
+        sheets = [('family', [(2, dict(FAMILY_ROW, case_number='1'))]),
+                  ('adult', [(2, dict(ADULT_ROW, case_number='1'))])]
+        with mock.patch('section1.ingest.MemberLoader.recheck', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                process_sheets(sheets, self.month, upload, self.user)
+
+        upload.refresh_from_db()
+        self.assertEqual((upload.rows_loaded, upload.rows_rejected), (1, 0))
+        self.assertIsNone(upload.completed_at)
+        self.assertEqual(Family.objects.count(), 1)
+        self.assertFalse(Adult.objects.exists())
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('file_upload', kwargs={'month_id': self.month.pk}))
+        self.assertContains(response, 'Not completed')
+
+    def test_rejected_rows_are_summarized_per_field_and_code(self):
+        rows = [dict(FAMILY_ROW, case_number=str(case), disposition='9') for case in range(3)]
+        rows.append(dict(FAMILY_ROW, case_number='3', disposition='9', stratum=''))
+        self.upload(family_csv(rows))
+        upload = FileUpload.objects.get()
+        self.assertEqual(sorted(upload.error_summaries.values_list('field', 'code', 'count')),
+                         [('disposition', 'invalid_choice', 4), ('stratum', 'required', 1)])
+        self.assertEqual(ImportError.objects.get(line=5).details['row']['case_number'], '3')
+
+        response = self.client.get(reverse('file_upload', kwargs={'month_id': self.month.pk}))
+        self.assertContains(response, 'family disposition (invalid_choice): 4')
+
+    def test_delete_missing_requires_upsert(self):
+        response = self.upload(family_csv([FAMILY_ROW]), delete_missing='on')
+        self.assertContains(response, 'Deleting missing records is only available when updating.')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class TransmissionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username='transmitter')
+        cls.quarter = Quarter.objects.create(report_quarter='2024Q1', start_date=datetime.date(2024, 1, 1),
+                                             end_date=datetime.date(2024, 3, 31))
+        for report_month in ('202401', '202402'):
+            month = Month.objects.create(report_month=report_month, quarter=cls.quarter,
+                                         start_date=datetime.date(2024, 1, 1), end_date=datetime.date(2024, 1, 31))
+            for case in range(4):
+                family = Family.objects.create(month=month, created_by=cls.user, updated_by=cls.user,
+                                               **dict(FAMILY_ROW, case_number=str(case + 1)))
+                for index in range(case % 2 + 1):
+                    Adult.objects.create(family=family, created_by=cls.user, updated_by=cls.user,
+                                         **dict(ADULT_ROW, ssn=str(index).zfill(9)))
+                # 0 to 3 children: a T3 line holds two, the last one may hold one.
+                for index in range(case):
+                    Child.objects.create(family=family, created_by=cls.user, updated_by=cls.user,
+                                         **dict(CHILD_ROW, ssn=str(100 + index).zfill(9)))
+
+    def snapshot(self):
+        def rows(model, *keys):
+            fields = [name for name, _ in LAYOUTS[model].fields]
+            return sorted(model_rows for model_rows in
+                          LAYOUTS[model].model.objects.values_list(*keys, *fields))
+        return (rows('T1', 'month__report_month'),
+                rows('T2', 'family__month__report_month', 'family__case_number'),
+                rows('T3', 'family__month__report_month', 'family__case_number'))
+
+    def test_exported_file_loads_back_unchanged(self):
+        expected = self.snapshot()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory)
+        save_quarter(self.quarter, '2024Q1.txt', self.user)
+        save_quarter(self.quarter, '2024Q1.txt', self.user, compress=True)
+        # Written straight into storage, nothing in the working directory.
+        self.assertEqual(os.listdir(directory), [])
+        plain, compressed = GeneratedFile.objects.order_by('pk')
+        with plain.file.open('r') as file:
+            lines = file.read().splitlines()
+        self.assertEqual(compressed.name, '2024Q1.txt.gz')
+        with gzip.open(compressed.file.path, 'rt') as file:
+            self.assertEqual(file.read().splitlines(), lines)
+        self.assertEqual(len({len(line) for line in lines if line.startswith('T1')}), 1)
+
+        Month.objects.all().delete()
+        counts = TransmissionLoader(self.user, batch_size=5).load(lines)
+        self.assertEqual((counts[Family], counts[Adult], counts[Child]), (8, 12, 12))
+        self.assertEqual(self.snapshot(), expected)
+        self.assertEqual(Month.objects.get(report_month='202402').quarter.report_quarter, '2024Q1')
+
+    def test_parallel_decode_loads_the_same_records(self):
+        expected = self.snapshot()
+        lines = ['Header: Processing records for Quarter ID 1']
+        for family in Family.objects.select_related('month').order_by('pk'):
+            keys = [family.month.report_month, family.case_number]
+            lines.append(LAYOUTS['T1'].encode(keys[:1], [family]))
+            lines.extend(LAYOUTS['T2'].encode(keys, [adult]) for adult in family.adult_set.all())
+            children = list(family.child_set.all())
+            lines.extend(LAYOUTS['T3'].encode(keys, children[i:i + 2]) for i in range(0, len(children), 2))
+        path = os.path.join(tempfile.mkdtemp(), '2024Q1.txt')
+        with open(path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+
+        Month.objects.all().delete()
+        counts = TransmissionLoader(self.user).load_parsed(parse_transmission_parallel(path, workers=2, chunk_size=500))
+        self.assertEqual((counts[Family], counts[Adult], counts[Child]), (8, 12, 12))
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_post_queues_export_and_worker_writes_the_file(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('create_file'), {'report_quarter': '2024Q1', 'compress': 'on'})
+        self.assertRedirects(response, reverse('create_file'))
+        job = BackgroundJob.objects.get()
+        self.assertEqual((job.job_type, job.status), (QUARTER_EXPORT, BackgroundJob.PENDING))
+        self.assertFalse(GeneratedFile.objects.exists())
+        self.assertContains(self.client.get(reverse('create_file')), reverse('job_progress', kwargs={'pk': job.pk}))
+
+        run_job(claim_next())
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.DONE, job.error)
+        self.assertEqual((job.steps_done, job.steps_total), (2, 2))
+        generated = GeneratedFile.objects.get()
+        self.assertTrue(generated.name.endswith('.txt.gz'))
+        self.assertEqual(generated.record_count, 28)
+        self.assertEqual(generated.size, os.path.getsize(generated.file.path))
+        self.assertEqual(job.result, {'generated_file': generated.pk, 'name': generated.name,
+                                      'record_count': 28, 'size': generated.size})
+
+        page = self.client.get(reverse('create_file'))
+        self.assertNotContains(page, reverse('job_progress', kwargs={'pk': job.pk}))
+        self.assertContains(page, generated.file.url)
+
+    def test_export_reads_each_table_once_per_month(self):
+        # The month list, then families, adults and children for each of the two months.
+        with self.assertNumQueries(7):
+            records = list(quarter_records(self.quarter))
+        self.assertEqual(len(records), 8 + 12 + 8)
+        self.assertEqual([record[:2] for record in records[:4]], ['T1', 'T2', 'T1', 'T2'])
+
+    def test_export_reencodes_only_changed_months(self):
+        save_quarter(self.quarter, '2024Q1.txt', self.user)
+        self.assertEqual(ExportSegment.objects.count(), 2)
+        family = Family.objects.filter(month__report_month='202402').first()
+        family.stratum = '02'
+        family.save()
+
+        with mock.patch('section1.export.month_records', wraps=export.month_records) as encoded:
+            generated = save_quarter(self.quarter, '2024Q1.txt', self.user)
+        self.assertEqual([call.args[0].report_month for call in encoded.call_args_list], ['202402'])
+        with generated.file.open('r') as file:
+            lines = file.read().splitlines()
+        self.assertEqual(lines[1:-1], list(quarter_records(self.quarter)))
+        self.assertEqual(lines[-1], f'Trailer: Total Records Processed {len(lines) - 2}')
+        self.assertEqual(ExportSegment.objects.count(), 2)
+
+    def test_export_picks_up_in_place_edits_that_skip_save(self):
+        save_quarter(self.quarter, '2024Q1.txt', self.user)
+        month = Month.objects.get(report_month='202401')
+        # Same row counts, and no save() to stamp updated_at through auto_now.
+        Family.objects.filter(month=month, case_number='00000000001').update(stratum='02')
+        adult = Adult.objects.filter(family__month=month).first()
+        adult.educational_level = '13'
+        Adult.objects.bulk_update([adult], ['educational_level'])
+
+        with mock.patch('section1.export.month_records', wraps=export.month_records) as encoded:
+            generated = save_quarter(self.quarter, '2024Q1.txt', self.user)
+        self.assertEqual([call.args[0].report_month for call in encoded.call_args_list], ['202401'])
+        with generated.file.open('r') as file:
+            self.assertEqual(file.read().splitlines()[1:-1], list(quarter_records(self.quarter)))
+
+    def test_export_reencodes_a_renamed_month(self):
+        save_quarter(self.quarter, '2024Q1.txt', self.user)
+        Month.objects.filter(report_month='202402').update(report_month='202403')
+
+        generated = save_quarter(self.quarter, '2024Q1.txt', self.user)
+        with generated.file.open('r') as file:
+            lines = file.read().splitlines()[1:-1]
+        self.assertEqual(lines, list(quarter_records(self.quarter)))
+        self.assertEqual({line[2:8] for line in lines}, {'202401', '202403'})
+
+    def test_encoder_rejects_values_wider_than_their_field(self):
+        family = Family.objects.first()
+        self.assertEqual(len(LAYOUTS['T1'].encode(['202401'], [family])), LAYOUTS['T1'].width)
+        family.stratum = '123'
+        with self.assertRaisesMessage(ValueError, "T1 stratum '123' for 202401 is longer than 2 characters."):
+            LAYOUTS['T1'].encode(['202401'], [family])
+
+    def test_member_of_unknown_family_is_rejected(self):
+        line = LAYOUTS['T2'].encode(['202403', '00000000009'], [Adult(**ADULT_ROW)])
+        with self.assertRaisesMessage(ValueError, 'Line 1: no family 00000000009 in 202403.'):
+            TransmissionLoader(self.user).load([line])
+        self.assertFalse(Month.objects.filter(report_month='202403').exists())
+
+    def test_malformed_lines_are_rejected(self):
+        family = LAYOUTS['T1'].encode(['202405'], [Family(**dict(FAMILY_ROW, case_number='00000000011'))])
+        header = 'Header: Processing records for Quarter ID 1'
+        for line, message in [
+                ('T1202405 11111', f"Line 2: T1 line is 14 characters long; expected {LAYOUTS['T1'].width}."),
+                (family + ' ', f"Line 2: T1 line is {len(family) + 1} characters long"),
+                ('T3202405' + ' ' * 11, "Line 2: T3 line is 19 characters long; expected "
+                                        f"{LAYOUTS['T3'].widths[1]} or {LAYOUTS['T3'].widths[2]}."),
+                ('T9202405 00000000011',
+                 "Line 2: Not a T1, T2 or T3 record, header or trailer: 'T9202405 00000000011'."),
+                ('', "Line 2: Not a T1, T2 or T3 record, header or trailer: ''.")]:
+            with self.subTest(line=line), self.assertRaisesMessage(ValueError, message):
+                TransmissionLoader(self.user).load([header, line, family])
+        self.assertFalse(Month.objects.filter(report_month='202405').exists())
+
+    def test_parallel_decode_reports_malformed_lines_by_file_line(self):
+        family = LAYOUTS['T1'].encode(['202405'], [Family(**dict(FAMILY_ROW, case_number='00000000011'))])
+        path = os.path.join(tempfile.mkdtemp(), '2024Q2.txt')
+        with open(path, 'w') as file:
+            file.write('\n'.join([family] * 5 + [family[:-1]]) + '\n')
+        with self.assertRaisesMessage(ValueError, 'Line 6: T1 line is'):
+            list(parse_transmission_parallel(path, workers=2, chunk_size=len(family) * 2))
@@ -5,7 +5,8 @@ from .views import (QuarterListView, QuarterDetailView, QuarterCreateView, Quart
                     FamilyListView, FamilyCreateView, FamilyUpdateView, FamilyDeleteView, \
                     AdultListView, AdultCreateView, AdultUpdateView, AdultDeleteView, \
                     ChildListView, ChildCreateView, ChildUpdateView, ChildDeleteView, \
-                    ValidateDataView, ErrorListView, FileUploadView, ProcessQuarterView)
+                    ValidateDataView, ErrorListView, FileUploadView, ProcessQuarterView, JobProgressView, \
+                    ValidationRunView)
 
 urlpatterns = [
     path("quarters/", QuarterListView.as_view(), name="quarter-list"),
@@ -43,6 +44,8 @@ urlpatterns = [
 
     path('validations/', ValidateDataView.as_view(), name='validate_data'),
     path('validations/<int:month>/version/<int:version>/errors/', ErrorListView.as_view(), name='error_list'),
+    path('validations/<int:month>/version/<int:version>/rules/', ValidationRunView.as_view(), name='validation_run'),
+    path('jobs/<int:pk>/progress/', JobProgressView.as_view(), name='job_progress'),
 
     path('upload/<int:month_id>/', FileUploadView.as_view(), name='file_upload'),
 
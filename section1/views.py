@@ -1,22 +1,28 @@
-import io, csv
-from datetime import datetime
-from django.db import transaction
-from django.db.models import Max, Count, Q
+import csv
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Max, Count, Q, F, Sum, OuterRef, Subquery, Prefetch
+from django.db.models.functions import Coalesce
 from django.contrib import messages
-from django.core.files import File
 from django.core.paginator import Paginator
 from django.views.generic import TemplateView
 from django.views.generic.edit import FormView
 from django.views import View
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
 from django.urls import reverse, reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.utils import timezone
 from django.views.generic import ListView, CreateView, UpdateView, DetailView, DeleteView
 import pandas as pd
 
-from .forms import QuarterForm, MonthForm, FamilyForm, AdultForm, ChildForm, MonthSelectionForm, FileUploadForm, QuarterSelectionForm
-from .models import Quarter, Month, Family, Adult, Child, ValidationResult, FileUpload, ImportError, GeneratedFile
-from .tasks import DataValidator
+from .forms import QuarterForm, MonthForm, FamilyForm, AdultForm, ChildForm, MonthSelectionForm, FileUploadForm, ProcessQuarterForm
+from .models import Quarter, Month, Family, Adult, Child, ValidationResult, ValidationRun, ValidationSummary, FileUpload, ImportErrorSummary, GeneratedFile, BackgroundJob
+from .jobs import enqueue, fail_stale_jobs, VALIDATION, QUARTER_EXPORT
+from .fingerprints import data_fingerprints
+from .ingest import (open_text, content_hash, make_loader, expected_headers, UPLOAD_FORMS, is_workbook,
+                     open_workbook, workbook_sheets, sheet_headers, sheet_rows, csv_rows, parse_csv_parallel,
+                     CHUNK_SIZE, SplitRecord)
 
 class QuarterListView(LoginRequiredMixin, ListView):
     model = Quarter
@@ -585,42 +591,31 @@ class ValidateDataView(TemplateView):
     
     valid_fips_codes = generate_valid_fips_codes()
     def get_month_stats(self):
-        month_stats = []
-        latest_versions = ValidationResult.objects.values('report_month').annotate(
-                            latest_version=Max('version'),
-                            max_updated_at=Max('updated_at')
-                            )
-        if latest_versions is not None:
-            for month_version in latest_versions:
-                report_month = month_version['report_month']
-                version = month_version['latest_version']
-                latest_run_date = month_version['max_updated_at']
-                
-                errors_count = ValidationResult.objects.filter(
-                    report_month=report_month, 
-                    version=version,
-                    edit_type='FATAL'
-                ).count()
-                
-                no_errors_count = ValidationResult.objects.filter(
-                    report_month=report_month, 
-                    version=version,
-                    edit_type='NOERROR'
-                ).count()
-                
-                month_stats.append({
-                    'month': report_month,
-                    'errors_count': errors_count,
-                    'no_errors_count': no_errors_count,
-                    'version': version,
-                    'max_updated_at': latest_run_date
-                })
-            return month_stats
+        # One query over the per-run summary counts, however many months and
+        # versions have been validated.
+        latest_version = (ValidationSummary.objects.filter(report_month=OuterRef('report_month'))
+                                                   .order_by('-version').values('version')[:1])
+        latest_runs = (ValidationSummary.objects.filter(version=Subquery(latest_version))
+                                                .values('report_month', 'version', 'run__seconds', 'run__queries')
+                                                .annotate(errors_count=Coalesce(Sum('count', filter=Q(edit_type='FATAL')), 0),
+                                                          no_errors_count=Coalesce(Sum('count', filter=Q(edit_number='T-000')), 0),
+                                                          max_updated_at=Max('validated_at'))
+                                                .order_by('report_month'))
+        return [{
+            'month': row['report_month'],
+            'errors_count': row['errors_count'],
+            'no_errors_count': row['no_errors_count'],
+            'version': row['version'],
+            'max_updated_at': row['max_updated_at'],
+            'run_seconds': row['run__seconds'],
+            'run_queries': row['run__queries'],
+        } for row in latest_runs]
                             
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         month_stats = self.get_month_stats()
         context['form'] = MonthSelectionForm()
+        context['jobs'] = recent_jobs(VALIDATION)
         #context['validated_months'] = ValidationResults.objects.values_list('report_month', flat=True).distinct()
         context['month_stats'] = month_stats
         return context
@@ -632,40 +627,54 @@ class ValidateDataView(TemplateView):
         form = MonthSelectionForm(request.POST)
         if form.is_valid():
             report_month = form.cleaned_data['report_month'].report_month
-            #version = self.perform_validation(request.user, report_month)
-            self.init_validation(request.user, report_month)
-            #if version is not None:
-                # Fetch validation results for the current report_month and version
-            #    validation_results = ValidationResults.objects.filter(report_month=report_month, version=version)
-            #    context = {'form': form, 'validation_results': validation_results}
-            #else:
-            #    context = {'form': form, 'message': 'Validation completed, but no results were found.'}
-            #messages.success(request, 'Validation completed successfully.')
+            # The run happens in the run_jobs worker; this page polls its progress.
+            enqueue(VALIDATION, request.user, report_month=report_month,
+                    incremental=form.cleaned_data['incremental'])
+            messages.info(request, f'Validation for {report_month} has been queued.')
             return redirect('validate_data')
-            #return render(request, self.template_name, context)
         else:
             context = self.get_context_data(**kwargs)
             context['form'] = form
             return self.render_to_response(context)
-        
-        return self.render_to_response(self.get_context_data(form=form))
-        #return render(request, self.template_name, {'form': form})
-    
-    def get_next_version(self, report_month):
-        latest_validation = ValidationResult.objects.filter(report_month=report_month).order_by('-version').first()
-        return (latest_validation.version + 1) if latest_validation else 1
 
-    def init_validation(self, user, report_month):
-        print(report_month)
-        try:
-            month_instance = Month.objects.get(report_month=report_month)
-        except Month.DoesNotExist:
-            print("Selected month does not exist.")
-            return
-        
-        version = self.get_next_version(report_month)
-        validator = DataValidator(user, version, report_month)
-        validator.perform_validation()
+def recent_jobs(job_type):
+    # Queued and running jobs, plus a day of failures so a failed job doesn't just vanish.
+    fail_stale_jobs()
+    return BackgroundJob.objects.filter(job_type=job_type).filter(
+        Q(status__in=[BackgroundJob.PENDING, BackgroundJob.RUNNING]) |
+        Q(status=BackgroundJob.FAILED, finished_at__gte=timezone.now() - timedelta(days=1))
+    ).select_related('created_by').order_by('created_at')
+
+class JobProgressView(LoginRequiredMixin, View):
+
+    def get(self, request, pk):
+        # Polling pages stop once a job whose worker died is marked failed.
+        fail_stale_jobs()
+        job = get_object_or_404(BackgroundJob, pk=pk)
+        return JsonResponse({
+            'status': job.status,
+            'error': job.error_message,
+            'steps_done': job.steps_done,
+            'steps_total': job.steps_total,
+            'errors_found': job.errors_found,
+            'eta_seconds': job.eta_seconds,
+            'result': job.result,
+        })
+
+class ValidationRunView(LoginRequiredMixin, DetailView):
+    model = ValidationRun
+    context_object_name = 'run'
+    template_name = 'section1/validation_run.html'
+
+    def get_object(self, queryset=None):
+        return get_object_or_404(ValidationRun, report_month=self.kwargs['month'], version=self.kwargs['version'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Slowest first; per-edit rows inside a shared scan have no time of their own.
+        context['rule_stats'] = self.object.rule_stats.order_by(
+            F('seconds').desc(nulls_last=True), '-errors_found', 'edit_number')
+        return context
 
 class ErrorListView(LoginRequiredMixin, ListView):
     model = ValidationResult
@@ -727,7 +736,10 @@ class FileUploadView(LoginRequiredMixin, FormView):
         if month_id:
             month = get_object_or_404(Month, pk=month_id)
             context['month'] = month.report_month
-            prior_uploads = FileUpload.objects.filter(month=month).order_by('-uploaded_at')
+            # Per-field error counts come from the summary rows, not from decoding every ImportError.
+            prior_uploads = (FileUpload.objects.filter(month=month).order_by('-uploaded_at')
+                             .prefetch_related(Prefetch('error_summaries',
+                                                        queryset=ImportErrorSummary.objects.order_by('-count', 'field'))))
             context['prior_uploads'] = prior_uploads
         return context
     
@@ -740,142 +752,162 @@ class FileUploadView(LoginRequiredMixin, FormView):
         month = Month.objects.get(report_month=form.cleaned_data['month'])
         model_type = form.cleaned_data['model_type']
         uploaded_file = self.request.FILES.get('file')
-        if not (uploaded_file.name.endswith('.csv') or uploaded_file.name.endswith('.xls') or uploaded_file.name.endswith('.xlsx')):
-            form.add_error('file', "Unsupported file type. Please upload a .csv or .xls(x) file.")
+        if not (uploaded_file.name.endswith('.csv') or uploaded_file.name.endswith('.xlsx')):
+            form.add_error('file', "Unsupported file type. Please upload a .csv or .xlsx file.")
             return self.form_invalid(form)
         
+        digest = content_hash(uploaded_file)
+        options = {'upsert': form.cleaned_data['upsert'], 'delete_missing': form.cleaned_data['delete_missing']}
+        same_file = FileUpload.objects.filter(month=month, model_type=model_type, content_hash=digest).order_by('-pk')
+        earlier = same_file.filter(completed_at__isnull=False, **options).first()
+        if earlier is not None and earlier.data_fingerprint == data_fingerprints([month])[month.pk]:
+            # The month's rows are exactly as loading this file with these options
+            # left them, so loading it again cannot change anything: report its result.
+            messages.success(self.request, f'{dict(form.fields["model_type"].choices).get(model_type)} Datafile is '
+                             f'identical to the one uploaded on {earlier.uploaded_at:%Y-%m-%d %H:%M}: '
+                             f'{earlier.rows_loaded} rows loaded, {earlier.rows_rejected} rejected.')
+            return super().form_valid(form)
+
         file_upload_instance = FileUpload(
             month=month,
             model_type=form.cleaned_data['model_type'],
             uploaded_by=self.request.user,
-            file=uploaded_file
+            file=uploaded_file,
+            content_hash=digest,
+            **options,
         )
-        upload_instance = FileUpload.objects.last()
-        
-        file_content = uploaded_file.read().decode('utf-8')
-        file_like = io.StringIO(file_content)
-        
-        is_valid = validate_csv_headers(file_like, FamilyForm)
-        if not is_valid:
-            form.add_error(None, "File headers do not match expected fields.")
-            return self.form_invalid(form)
+        stored = earlier or same_file.first()
+        if stored is not None:
+            # Same bytes as a stored file: point at that blob instead of writing another copy.
+            file_upload_instance.file = stored.file.name
+
+        if is_workbook(uploaded_file):
+            workbook = open_workbook(uploaded_file)
+            try:
+                sheets = workbook_sheets(workbook, model_type)
+                for sheet_type, worksheet in sheets:
+                    if not headers_match(sheet_headers(worksheet), UPLOAD_FORMS[sheet_type]):
+                        form.add_error(None, f"Sheet '{worksheet.title}' headers do not match expected fields.")
+                        return self.form_invalid(form)
+                file_upload_instance.save()
+                loaders = process_sheets([(sheet_type, sheet_rows(worksheet)) for sheet_type, worksheet in sheets],
+                                         month, file_upload_instance, self.request.user, **options)
+            finally:
+                workbook.close()
         else:
-            file_like = io.StringIO(file_content)
-            process_file(file_like, FamilyForm, ImportError, model_type, month, upload_instance, self.request.user)
-        file_upload_instance.save()
-
-        model_verbose = dict(form.fields['model_type'].choices).get(model_type)
-        messages.success(self.request, f'{model_verbose} Datafile successfully uploaded.')
+            # The upload is decoded while it is read, so memory use does not grow with file size.
+            with open_text(uploaded_file) as file_like:
+                is_valid = validate_csv_headers(file_like, UPLOAD_FORMS[model_type])
+            if not is_valid:
+                form.add_error(None, "File headers do not match expected fields.")
+                return self.form_invalid(form)
+
+            # Saved first so rejected rows point at this upload.
+            file_upload_instance.save()
+            if settings.INGEST_WORKERS > 1 and uploaded_file.size > CHUNK_SIZE:
+                # Workers read their ranges from the stored copy of the upload.
+                loaders = [process_file_parallel(file_upload_instance.file.path, model_type, month,
+                                                 file_upload_instance, self.request.user,
+                                                 settings.INGEST_WORKERS, **options)]
+            else:
+                with open_text(uploaded_file) as file_like:
+                    loaders = [process_file(file_like, model_type, month, file_upload_instance, self.request.user,
+                                            **options)]
+
+        choices = dict(form.fields['model_type'].choices)
+        summaries = []
+        for loader in loaders:
+            summary = f'{loader.loaded} rows loaded, {loader.rejected} rejected'
+            if loader.upsert:
+                summary += f', {loader.updated} updated, {loader.unchanged} unchanged, {loader.deleted} deleted'
+            summaries.append(f'{choices.get(loader.model_type)} Datafile successfully uploaded: {summary}.')
+        messages.success(self.request, ' '.join(summaries))
         return super().form_valid(form)
 
-def validate_csv_headers(file_like, form_class):
-    expected_headers = [field for field in form_class.Meta.fields]
+def headers_match(headers, form_class):
+    return bool(headers) and set(header.strip() for header in headers) == set(expected_headers(form_class))
 
+def validate_csv_headers(file_like, form_class):
     reader = csv.DictReader(file_like)
-    if set(header.strip() for header in reader.fieldnames) != set(expected_headers):
-        return False
-    return True
+    return headers_match(reader.fieldnames, form_class)
 
-def process_file(file, form_class, error_model, model_type, month, upload_instance, user):
+def process_file(file, model_type, month, upload_instance, user, upsert=False, delete_missing=False):
     reader = csv.DictReader(file)
-    valid_rows = []
-    with transaction.atomic():
-        for row in reader:
-            form = form_class(data=row)
-            if form.is_valid():
-                instance = form.save(commit=False)
-                instance.month = month
-                instance.created_by = user
-                instance.updated_by = user
-                instance.save()
-                valid_rows.append(form.cleaned_data)
-                form.save()
-            else:
-                error_model.objects.create(
-                    upload=upload_instance,
-                    model_type=model_type,
-                    original_data=row,
-                    errors=form.errors.as_json(),
-                    created_by=user,
-                    updated_by=user
-                )
+    return process_sheets([(model_type, csv_rows(reader))], month, upload_instance, user, upsert, delete_missing)[0]
+
+def process_file_parallel(path, model_type, month, upload_instance, user, workers, upsert=False, delete_missing=False,
+                          chunk_size=CHUNK_SIZE):
+    # Worker processes parse and validate byte ranges of the file; this process
+    # resolves families, checks uniqueness and writes the rows in file order.
+    parsed = parse_csv_parallel(path, model_type, workers, chunk_size)
+    try:
+        return process_sheets([(model_type, parsed)], month, upload_instance, user, upsert, delete_missing,
+                              parsed=True)[0]
+    except SplitRecord:
+        # Ranges are cut at newlines, so a record with a quoted line break can
+        # only be read whole by reading the file from the start.
+        with open(path, encoding='utf-8', newline='') as file:
+            return process_file(file, model_type, month, upload_instance, user, upsert, delete_missing)
+
+def process_sheets(sheets, month, upload_instance, user, upsert=False, delete_missing=False, parsed=False):
+    # Rows are checked against a plan compiled from the model type's form and
+    # inserted in batches; rows the form would reject are stored as ImportError rows.
+    # With upsert, rows already stored for the month are updated when they changed.
+    # Each loader is built once the sheets before it are in, so adults and
+    # children find the families loaded from the same workbook. Rows are staged
+    # while a sheet is read and merged into the live tables in one short
+    # transaction per sheet.
+    loaders = []
+    for index, (model_type, rows) in enumerate(sheets):
+        loader = make_loader(model_type, upload_instance, user, month, upsert=upsert, delete_missing=delete_missing)
+        loaders.append(loader)
+        # Each merge records the counts so far in its own transaction, so a sheet
+        # that fails leaves the upload showing what did load. The last one marks
+        # the upload complete, with the fingerprint this load left and not one
+        # with a later upload mixed in.
+        complete = index == len(sheets) - 1
+        loader.after_merge = lambda complete=complete: record_upload(upload_instance, month, loaders, complete)
+        if parsed:
+            loader.load_parsed(rows)
+        else:
+            loader.load(rows)
+    return loaders
+
+def record_upload(upload_instance, month, loaders, complete):
+    counts = dict(rows_loaded=sum(loader.loaded for loader in loaders),
+                  rows_updated=sum(loader.updated for loader in loaders),
+                  rows_deleted=sum(loader.deleted for loader in loaders),
+                  rows_rejected=sum(loader.rejected for loader in loaders))
+    if complete:
+        counts.update(completed_at=timezone.now(), data_fingerprint=data_fingerprints([month])[month.pk])
+    FileUpload.objects.filter(pk=upload_instance.pk).update(**counts)
 
 class ProcessQuarterView(LoginRequiredMixin, FormView):
     template_name = 'section1/process_quarter.html'
-    form_class = QuarterSelectionForm
+    form_class = ProcessQuarterForm
     success_url = reverse_lazy('create_file') 
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         #context = super(ProcessQuarterView, self).get_context_data(**kwargs)
-        context['files'] = GeneratedFile.objects.all().order_by('-created_at') 
+        context['jobs'] = recent_jobs(QUARTER_EXPORT)
+        context['files'] = GeneratedFile.objects.select_related('quarter', 'created_by').order_by('-created_at')
         return context
     
     def form_valid(self, form):
         report_quarter = form.cleaned_data['report_quarter']
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_file_name = f"{report_quarter}_{timestamp}.txt"
-        user = self.request.user
-        result = process_quarter(report_quarter.id, output_file_name,user)
-        if result:
-            messages.success(self.request, "Quarter processed successfully.")
-            return redirect('create_file')
-        else:
-            messages.success(self.request, "Quarter did not process successfully.")
-        return super().form_valid(form)
-        #return redirect('create_file')
-        #return super(ProcessQuarterView, self).form_valid(form)
+        # The file is written by the run_jobs worker; this page polls its progress.
+        enqueue(QUARTER_EXPORT, self.request.user, quarter_id=report_quarter.id,
+                report_quarter=str(report_quarter), name=output_file_name,
+                compress=form.cleaned_data['compress'])
+        messages.info(self.request, f"File for {report_quarter} has been queued; it can be downloaded below once it is ready.")
+        return redirect('create_file')
 
     def get_success_url(self):
         return reverse_lazy('create_file')
 
-def concatenate_model_fields(instance):
-    field_values = []
-    exclude_fields = ['family', 'id', 'month', 'created_at', 'updated_at', 'created_by', 'updated_by']
-    for field in instance._meta.get_fields():
-        if field.concrete and not field.is_relation and field.name not in exclude_fields:
-            field_value = getattr(instance, field.name, '')
-            field_values.append(str(field_value))
-    return "".join(field_values)
-
-def process_quarter(quarter_id, output_file_name, user):
-    record_count = 0 
-    output_file_path = f'{output_file_name}'
-    try:
-        quarter = Quarter.objects.get(id=quarter_id)
-    except Quarter.DoesNotExist:
-        print("Quarter not found")
-        return
-
-    with open(output_file_path, 'w') as file:
-        file.write("Header: Processing records for Quarter ID {}\n".format(quarter_id))
-        for month in quarter.month_set.all():
-            for family in month.family_set.all():
-                family_data = "T1" + family.month.report_month + concatenate_model_fields(family)
-                file.write(family_data + "\n")
-                record_count += 1
-                for adult in family.adult_set.all():
-                    adult_data = "T2" + family.month.report_month + family.case_number + concatenate_model_fields(adult)
-                    file.write(adult_data + "\n")
-                    record_count += 1
-
-                children = list(family.child_set.all())
-                for i in range(0, len(children), 2):
-                    child_data = "T3" + family.month.report_month + family.case_number
-                    child_data += concatenate_model_fields(children[i])
-                    if i + 1 < len(children):
-                        child_data += concatenate_model_fields(children[i + 1])
-                    file.write(child_data + "\n")
-                    record_count += 1
-        file.write("Trailer: Total Records Processed {}\n".format(record_count))
-
-    with open(output_file_path, 'rb') as file_for_upload:        
-        django_file = File(file_for_upload)
-        generated_file = GeneratedFile(quarter=quarter, name=output_file_name, file=django_file, created_by=user)
-        generated_file.save()
-
-    #print(f"File {output_file_name} saved with ID {generated_file.name}")
-    return True
 '''
 class ListFilesView(LoginRequiredMixin, FormView):
     template_name = 'section1/list_files.html'